@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import database_module as db
+from Predictors import createPredictor, walkForward
+
+"""
+    Walk-forward backtesting over the price history in stocksDB.db.
+
+    The test part of each ticker's history is cut into folds. Each fold is
+    replayed independently with walkForward, so folds and tickers can all
+    run at the same time in a pool of processes. The stitched predictions
+    are then scored, all with vectorized numpy:
+
+        mae, rmse, mape        - error of the predicted close
+        direction              - how often the predicted move had the right sign
+        strategy / buy & hold  - total return of going long for a day when the
+                                 predicted close is above today's close and
+                                 staying flat otherwise, against holding
+        sharpe, max drawdown   - of the long/flat strategy's daily returns
+"""
+
+TRADING_DAYS = 252
+
+""" splits rows start to rowCount into foldCount (start, end) ranges """
+def makeFolds(rowCount, start, foldCount):
+    edges = np.linspace(start, rowCount, foldCount + 1).astype(int)
+    return [(int(edges[index]), int(edges[index + 1]))
+            for index in range(foldCount) if edges[index] < edges[index + 1]]
+
+""" replays one fold of one ticker. Runs in a worker process, so it opens
+    its own database connection """
+def runFold(dbFile, ticker, backend, options, foldStart, foldEnd, refitEvery, trainWindow):
+    predictor = createPredictor(backend, **options)
+
+    conn = db.get_connection(dbFile)
+    data = db.select_columns(conn, ticker, predictor.requiredColumns())
+
+    predictions, fitSeconds, predictSeconds = walkForward(predictor, data, foldStart, refitEvery,
+                                                          foldEnd, trainWindow)
+    return ticker, foldStart, predictions
+
+""" scores predictions[i] for closes[start + i] against the actual closes """
+def scorePredictions(closes, predictions, start):
+    closes = np.asarray(closes, dtype=np.float64)
+    actual = closes[start:]
+    previous = closes[start - 1:-1]
+
+    errors = predictions - actual
+    dailyReturns = actual / previous - 1
+
+    # long for the day when the model expects the close to go up
+    positions = (predictions > previous).astype(np.float64)
+    strategyReturns = positions * dailyReturns
+
+    equity = np.cumprod(1 + strategyReturns)
+    drawdowns = 1 - equity / np.maximum.accumulate(equity)
+    deviation = np.std(strategyReturns)
+
+    return {'days': len(actual),
+            'mae': float(np.mean(np.abs(errors))),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mape': float(np.mean(np.abs(errors) / actual) * 100),
+            'direction': float(np.mean(np.sign(predictions - previous) == np.sign(actual - previous)) * 100),
+            'strategyReturn': float((equity[-1] - 1) * 100),
+            'buyHoldReturn': float((actual[-1] / previous[0] - 1) * 100),
+            'sharpe': float(np.mean(strategyReturns) / deviation * np.sqrt(TRADING_DAYS)) if deviation > 0 else 0.0,
+            'maxDrawdown': float(np.max(drawdowns) * 100),
+            'trades': int(np.count_nonzero(np.diff(positions)) + positions[0])}
+
+"""
+    Backtests a predictor backend over many tickers. testFraction of each
+    history is predicted, split into foldCount folds. trainWindow limits
+    training to that many of the latest days (rolling), None trains on all
+    earlier days (expanding). Returns a dict of {ticker: scores}, tickers
+    that failed get {'error': message}.
+"""
+
+def backtest(dbFile, tickers, backend='ar', options=None, testFraction=.2, foldCount=4,
+             refitEvery=20, trainWindow=None, workers=None):
+    options = options or {}
+
+    conn = db.get_connection(dbFile)
+    closesByTicker = {ticker: db.select_columns(conn, ticker, ['close'])['close'] for ticker in tickers}
+
+    tasks = []
+    for ticker, closes in closesByTicker.items():
+        start = max(1, int(len(closes) * (1 - testFraction)))
+        for foldStart, foldEnd in makeFolds(len(closes), start, foldCount):
+            tasks.append((dbFile, ticker, backend, options, foldStart, foldEnd, refitEvery, trainWindow))
+
+    predictionsByTicker = {ticker: {} for ticker in tickers}
+    results = {}
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context) as executor:
+        futures = [(task[1], executor.submit(runFold, *task)) for task in tasks]
+
+        for ticker, future in futures:
+            try:
+                ticker, foldStart, predictions = future.result()
+                predictionsByTicker[ticker][foldStart] = predictions
+            except Exception as e:
+                results[ticker] = {'error': str(e)}
+
+    for ticker, folds in predictionsByTicker.items():
+        if ticker in results:
+            continue
+        if not folds:
+            results[ticker] = {'error': "Not enough data to backtest"}
+            continue
+
+        start = min(folds)
+        predictions = np.concatenate([folds[foldStart] for foldStart in sorted(folds)])
+        results[ticker] = scorePredictions(closesByTicker[ticker], predictions, start)
+
+    return results
@@ -0,0 +1,149 @@
+import os
+import threading
+import numpy as np
+from PriceLevels import rollupDays
+
+"""
+    Compact columnar storage for intraday bars, next to the SQLite
+    database. Every ticker and interval is split into one folder per
+    month holding one .npy file per column, sorted by time
+
+    bars/
+        1m/
+            ADI/
+                2026-10/
+                    date.npy     int64 epoch second start of each bar
+                    open.npy     float32
+                    ...
+                    volume.npy   int64
+
+    A month of minute bars is about 8,000 rows and 280KB, with no index
+    or per row overhead. Months are opened memory mapped, so a range read
+    only finds its ends with searchsorted on the date column and hands
+    back views into the mapped files without copying any bars. Only a
+    range that crosses months has to be copied to be joined up.
+
+    Windows cannot replace a file while it is mapped, so there the views
+    of a month have to be let go before that month is written.
+"""
+
+BAR_COLUMNS = {'date': np.int64, 'open': np.float32, 'high': np.float32,
+               'low': np.float32, 'close': np.float32, 'volume': np.int64}
+
+""" 'YYYY-MM' partition of each epoch second time """
+def monthKeys(times):
+    return np.asarray(times, dtype='datetime64[s]').astype('datetime64[M]').astype(str)
+
+class BarStore():
+
+    def __init__(self, directory='bars'):
+        self.directory = directory
+
+        # memory mapped columns per (ticker, interval, month)
+        self.mapped = {}
+        self.lock = threading.Lock()
+
+    def tickerPath(self, ticker, interval):
+        return os.path.join(self.directory, interval, str.upper(ticker))
+
+    """ the stored months of a ticker and interval, oldest first """
+    def months(self, ticker, interval):
+        path = self.tickerPath(ticker, interval)
+        if not os.path.isdir(path):
+            return []
+        return sorted(month for month in os.listdir(path) if os.path.exists(os.path.join(path, month, 'date.npy')))
+
+    """ the memory mapped columns of one month """
+    def monthBars(self, ticker, interval, month):
+        key = (str.upper(ticker), interval, month)
+        with self.lock:
+            if key not in self.mapped:
+                path = os.path.join(self.tickerPath(ticker, interval), month)
+                self.mapped[key] = {column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r')
+                                    for column in BAR_COLUMNS}
+            return self.mapped[key]
+
+    """ yields the bars from startTime to endTime (epoch seconds, both
+        included) one month at a time, as dicts of views into the mapped
+        files. Nothing is copied """
+    def chunks(self, ticker, interval, startTime=None, endTime=None):
+        months = self.months(ticker, interval)
+        if startTime is not None:
+            months = [month for month in months if month >= monthKeys([startTime])[0]]
+        if endTime is not None:
+            months = [month for month in months if month <= monthKeys([endTime])[0]]
+
+        for month in months:
+            bars = self.monthBars(ticker, interval, month)
+            first = 0 if startTime is None else np.searchsorted(bars['date'], startTime, side='left')
+            last = len(bars['date']) if endTime is None else np.searchsorted(bars['date'], endTime, side='right')
+            if first < last:
+                yield {column: values[first:last] for column, values in bars.items()}
+
+    """ returns the bars from startTime to endTime as one dict of arrays.
+        A range within one month is returned as views, a range crossing
+        months is copied into new arrays. chunks walks a long range without
+        copying """
+    def read(self, ticker, interval, startTime=None, endTime=None):
+        chunks = list(self.chunks(ticker, interval, startTime, endTime))
+        if len(chunks) == 1:
+            return chunks[0]
+        return {column: np.concatenate([chunk[column] for chunk in chunks]) if chunks else np.empty(0, dtype)
+                for column, dtype in BAR_COLUMNS.items()}
+
+    """ rolls the bars from startTime to endTime up into daily bars. Days
+        never cross a month, so each month is rolled up on its own views """
+    def daily(self, ticker, interval, startTime=None, endTime=None):
+        days = [rollupDays(chunk) for chunk in self.chunks(ticker, interval, startTime, endTime)]
+        if not days:
+            return {column: np.empty(0, dtype) for column, dtype in BAR_COLUMNS.items()}
+        return {column: np.concatenate([day[column] for day in days]) for column in BAR_COLUMNS}
+
+    """ start of the last stored bar, or None """
+    def lastTime(self, ticker, interval):
+        months = self.months(ticker, interval)
+        if not months:
+            return None
+        return int(self.monthBars(ticker, interval, months[-1])['date'][-1])
+
+    """ merges bars (a dict of arrays with the BAR_COLUMNS) into the store.
+        A bar with the same start as a stored one replaces it. Only the
+        months the bars fall in are rewritten, each column to a temporary
+        file that then replaces the old one under the store's lock, so
+        reads through this store never map half a month. The stored bars
+        are copied out and the store's maps of the month dropped before the
+        files are replaced. Returns the number of bars given """
+    def write(self, ticker, interval, bars):
+        ticker = str.upper(ticker)
+        keys = monthKeys(bars['date'])
+
+        for month in np.unique(keys):
+            inMonth = keys == month
+            new = {column: np.asarray(bars[column])[inMonth].astype(dtype) for column, dtype in BAR_COLUMNS.items()}
+
+            path = os.path.join(self.tickerPath(ticker, interval), month)
+            if os.path.exists(os.path.join(path, 'date.npy')):
+                # a copy, so nothing here keeps the old files mapped
+                old = {column: np.array(values) for column, values in self.monthBars(ticker, interval, month).items()}
+                merged = {column: np.concatenate((old[column], new[column])) for column in BAR_COLUMNS}
+            else:
+                merged = new
+
+            # stable sort keeps the new copy of a repeated start after the
+            # old one, and only the last copy of every start is kept
+            order = np.argsort(merged['date'], kind='stable')
+            dates = merged['date'][order]
+            keep = order[np.concatenate((dates[1:] != dates[:-1], [True]))]
+
+            with self.lock:
+                # the mapped files are replaced, later reads map the new ones.
+                # dropping the maps unmaps them unless a caller holds views
+                self.mapped.pop((ticker, interval, month), None)
+                os.makedirs(path, exist_ok=True)
+                # date last, a month only counts as stored once it is there
+                for column in sorted(BAR_COLUMNS, key=lambda column: column == 'date'):
+                    tempPath = os.path.join(path, column + '.tmp.npy')
+                    np.save(tempPath, merged[column][keep])
+                    os.replace(tempPath, os.path.join(path, column + '.npy'))
+
+        return len(bars['date'])
@@ -0,0 +1,59 @@
+import numpy as np
+from Indicators import sma, rsi, macd, bollinger, atr, vwap, fillWarmup
+
+""" Input features the LSTM predictor can be trained on. Each one maps to
+    the price columns it needs and a function that builds it from the dict
+    of arrays returned by database_module.select_columns.
+
+    Kept apart from LSTM.py so the command line tools can check the
+    features without importing TensorFlow. """
+FEATURES = {
+    'open': (['open'], lambda data: data['open']),
+    'high': (['high'], lambda data: data['high']),
+    'low': (['low'], lambda data: data['low']),
+    'close': (['close'], lambda data: data['close']),
+    'volume': (['volume'], lambda data: data['volume']),
+    # day over day percent change of the close, 0 for the first day
+    'return': (['close'], lambda data: np.concatenate(([0.0], np.diff(data['close']) / data['close'][:-1]))),
+    # high to low range as a fraction of the close
+    'range': (['high', 'low', 'close'], lambda data: (data['high'] - data['low']) / data['close']),
+    'logVolume': (['volume'], lambda data: np.log1p(data['volume'])),
+    # indicators, scaled so they do not depend on the price level
+    'sma': (['close'], lambda data: fillWarmup(data['close'] / sma(data['close'], 20) - 1)),
+    'rsi': (['close'], lambda data: fillWarmup(rsi(data['close'], 14) / 100)),
+    'macd': (['close'], lambda data: macd(data['close'])[2] / data['close']),
+    'bollinger': (['close'], lambda data: fillWarmup(bollingerPosition(data['close']))),
+    'atr': (['high', 'low', 'close'], lambda data: fillWarmup(atr(data['high'], data['low'], data['close'], 14) / data['close'])),
+    'vwap': (['high', 'low', 'close', 'volume'],
+             lambda data: fillWarmup(data['close'] / vwap(data['high'], data['low'], data['close'], data['volume'], 20) - 1)),
+    # mean VADER compound score of the day's stored headlines, 0 without news
+    'sentiment': (['sentiment'], lambda data: data['sentiment']),
+}
+
+""" How many earlier days an indicator feature needs to settle. Online
+    updates keep this many extra days in their buffer """
+FEATURE_WARMUP = {'sma': 20, 'rsi': 50, 'macd': 100, 'bollinger': 20, 'atr': 50, 'vwap': 20}
+
+""" where the close sits between the lower (0) and upper (1) bollinger band """
+def bollingerPosition(closes):
+    middle, upper, lower = bollinger(closes, 20, 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (closes - lower) / (upper - lower)
+
+# the features the GUI and the command line tools train on unless told
+# otherwise. The close alone gives the network nothing a naive forecast
+# does not have, so the day's return, range and volume go with it, along
+# with momentum (rsi, macd) and where the close sits in its recent range
+# (bollinger). sentiment is left to be asked for, most stored days have
+# no headlines
+DEFAULT_FEATURES = ('close', 'return', 'range', 'logVolume', 'rsi', 'macd', 'bollinger')
+
+""" the price columns that have to be read from the database to build a
+    list of features. The close is always read, it is the target """
+def requiredColumns(features):
+    columns = ['close']
+    for feature in features:
+        for column in FEATURES[feature][0]:
+            if column not in columns:
+                columns.append(column)
+    return columns
@@ -1,15 +1,22 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-from datetime import date, datetime
-from dateutil.relativedelta import relativedelta
-from YahooStockGrab import getYahooData, getIndicesGoogle
+from YahooStockGrab import getIndices
 import database_module as db
 from PyQt5.QtChart import *
 from PyQt5.QtGui import QColor, QPainter
 from PyQt5 import QtCore
 import time
 import random
-from LSTM import LSTMPredictor
-from NewsScraper import getNews
+from ModelRegistry import ModelRegistry
+from Indicators import IndicatorCache, loadLfilter
+from PriceLevels import PriceLevelCache
+from QuoteService import QuoteService
+from NetworkPresets import DEFAULT_LOOKBACK
+from Features import DEFAULT_FEATURES
+from collections import OrderedDict
+
+# LSTM (TensorFlow, sklearn) and NewsScraper (nltk) are slow to import, so
+# they are imported where they are used and preloaded by WarmUpThread once
+# the window is showing
 
 """ Controller class that is primarily used to
     handle the different threads that run in the application """
@@ -23,7 +30,10 @@ class GuiCtrl():
         self.updateFlashColor = "#999900"
 
         # establish a connection to the database
-        self.dbConn = db.create_connection('stocksDB.db')
+        self.dbConn = db.get_connection()
+
+        # move any old one-table-per-ticker data into the prices table
+        db.migrate_legacy_tables(self.dbConn)
 
         # a variable to set true if a chart has been displayed
         # we will use this variable to delete the chart and display another
@@ -32,11 +42,22 @@ class GuiCtrl():
 
         self.currentNews = None
 
+        # the ticker shown in the table and chart
+        self.displayedTicker = None
+
+        # indicator series per ticker, and the ones drawn on the chart
+        self.indicatorCache = IndicatorCache()
+        self.chartIndicators = None
+
+        # daily, weekly and monthly bars per ticker for the chart
+        self.levelCache = PriceLevelCache()
+
         # create instances of each thread
         self.goButtonThread = GoButtonThread(gui, self)
         self.indexThread = IndexThread(self)
         self.updateThread = UpdateThread(gui, self)
-        self.lstmThread = LSTMThread(self.gui)
+        self.lstmThread = LSTMThread(self.gui, DEFAULT_LOOKBACK, DEFAULT_FEATURES)
+        self.warmUpThread = WarmUpThread()
 
         # start certain threads at runtime
         self.indexThread.start()
@@ -45,6 +66,8 @@ class GuiCtrl():
 
     def display(self):
         self.gui.show()
+        # load the heavy modules once the event loop has drawn the window
+        QtCore.QTimer.singleShot(0, self.warmUpThread.start)
 
     """ This function has all of the signals that need to be dealt with
         as they are called. Connects them to their respective functions """
@@ -54,12 +77,13 @@ class GuiCtrl():
         self.goButtonThread.populateNewsSig.connect(self.populateNews)
         self.goButtonThread.lstmSig.connect(self.lstmThread.setStockData)
         self.goButtonThread.errorSig.connect(self.showMessageBox)
-        self.updateThread.updateCloseSig.connect(self.updateTable)
+        self.updateThread.quotesChangedSig.connect(self.updateQuotes)
         self.updateThread.updateNewsSig.connect(self.populateNews)
         self.updateThread.errorSig.connect(self.showMessageBox)
         self.lstmThread.readyToPredictSig.connect(self.startLSTMThread)
         self.lstmThread.predictionSig.connect(self.updatePredictedPrice)
         self.lstmThread.errorSig.connect(self.showMessageBox)
+        self.indexThread.indexSig.connect(self.updateIndexLabels)
         self.indexThread.errorSig.connect(self.showMessageBox)
 
     def startGoButtonThread(self):
@@ -93,120 +117,76 @@ class GuiCtrl():
         if(self.updateThread.isRunning()):
             self.updateThread.running = False
             self.updateThread.quit()
+        if(self.lstmThread.isRunning()):
+            self.lstmThread.stop()
 
-    """ gets and returns a dataframe of stock prices for a given ticker """
-    def getTickerPrices(self, ticker):
-
-        self.gui.predictedLabel.setText("              Retrieving Data...")
-
-        # get today's date
-        todayDate = date.today()
-        todayDate = todayDate + relativedelta(days=1)
-        lastYearDate = todayDate - relativedelta(years=1, days=1)
-
-        todayDate = todayDate.strftime('%d-%m-%Y')
-        lastYearDate = lastYearDate.strftime('%d-%m-%Y')
-
-        # grab a year's worth of data
-        stockData = getYahooData(ticker, lastYearDate, todayDate, "1d")
-        
-        return stockData
-
-    def getLastClose(self, ticker):
+        # the threads have to be done with their connections before those
+        # are closed. A preload still importing cannot be stopped, only
+        # waited for
+        for thread in (self.goButtonThread, self.indexThread, self.updateThread,
+                       self.lstmThread, self.warmUpThread):
+            thread.wait()
 
-        todayDate = date.today()
-        todayDate = todayDate + relativedelta(days=1)
-        lastYearDate = todayDate - relativedelta(days=10)
+        # close every database connection the threads opened
+        db.close_all_connections()
 
-        todayDate = todayDate.strftime('%d-%m-%Y')
-        lastYearDate = lastYearDate.strftime('%d-%m-%Y')
+    """ brings the database up to date for a given ticker. Only the
+        bars after the last stored date are downloaded and upserted """
+    def syncTickerPrices(self, conn, ticker):
 
-        # grab a year's worth of data
-        stockData = getYahooData(ticker, lastYearDate, todayDate, "1d")
+        self.gui.predictedLabel.setText("              Retrieving Data...")
 
-        return stockData
+        return db.sync_ticker(conn, ticker)
 
     """ puts price data from the database into the table on the GUI """
     def populateTable(self, ticker):
 
-        # clear what is currently in the table
-        self.clearTable()
-
-        # get the stockData from the database
-        stockData = db.select_all(self.dbConn, ticker)
-
-        # Set the date cells in the table
-        rowNum = 6 # start at the second row on the table
-        pandaRowNum = len(stockData)-1
-        for x in range(pandaRowNum, -1, -1):
-            # set date cells
-            # first make visible in case we've previously made it unvisible
-            self.gui.cellList[rowNum].setVisible(True)
-            self.gui.cellList[rowNum].setText(" " + stockData.loc[pandaRowNum][0] + " ")
-
-            # set open cells
-            self.gui.cellList[rowNum+1].setVisible(True)
-            self.gui.cellList[rowNum+1].setText("$" + str(stockData.loc[pandaRowNum][1]))
-
-            # set high cells
-            self.gui.cellList[rowNum+2].setVisible(True)
-            self.gui.cellList[rowNum+2].setText("$" + str(stockData.loc[pandaRowNum][2]))
-
-            # set low cells
-            self.gui.cellList[rowNum+3].setVisible(True)
-            self.gui.cellList[rowNum+3].setText("$" + str(stockData.loc[pandaRowNum][3]))
-
-            # set close cells
-            self.gui.cellList[rowNum+4].setVisible(True)
-            self.gui.cellList[rowNum+4].setText("$" + str(stockData.loc[pandaRowNum][4]))
-
-            # set volume cells
-            self.gui.cellList[rowNum+5].setVisible(True)
-            self.gui.cellList[rowNum+5].setText(" " + str(stockData.loc[pandaRowNum][5]))
-                            
-            rowNum += 6
-            pandaRowNum -= 1
-
-        # for the cells that we did not set a value for
-        # make them disappear
-        pandaRowNum = len(stockData)
-        for x in range(pandaRowNum, 254):
-
-            # set date cells
-            self.gui.cellList[rowNum].setVisible(False)
-
-            # set open cells
-            self.gui.cellList[rowNum+1].setVisible(False)
-
-            # set high cells
-            self.gui.cellList[rowNum+2].setVisible(False)
-
-            # set low cells
-            self.gui.cellList[rowNum+3].setVisible(False)
-
-            # set close cells
-            self.gui.cellList[rowNum+4].setVisible(False)
-
-            # set volume cells
-            self.gui.cellList[rowNum+5].setVisible(False)
-                            
-            rowNum += 6
-
+        # get the stockData from the database and hand the arrays to the
+        # table model in one go
+        stockData = db.select_columns(self.dbConn, ticker, ['date', 'open', 'high', 'low', 'close', 'volume'])
+        self.gui.priceTableModel.setPriceData(stockData)
+        self.displayedTicker = str.upper(ticker)
 
         # update the candlestick chart
-        self.gui.updateChartSeries()
+        self.gui.updateChartSeries(self.levelCache.get(ticker, stockData))
+
+        # draw the indicators over it, only new days are computed when the
+        # ticker was shown before
+        self.chartIndicators = self.indicatorCache.get(ticker, stockData)
+        self.gui.updateOverlaySeries(self.chartIndicators.dateSeries(), self.chartIndicators.allSeries())
 
         # at this point the go button should still be disabled from the
         # go button thread. Enable it now
         self.gui.scanButton.setEnabled(True)
 
+    """ takes the list of tickers the quote service wrote new prices for
+        and updates the table and chart when the shown ticker is one """
+    def updateQuotes(self, tickers):
+        if self.displayedTicker in tickers:
+            self.updateTable(self.displayedTicker)
+
     """ updates the close price of the last row in the table"""
     def updateTable(self, ticker):
         stockData = db.select_last_row(self.dbConn, ticker)
 
-        if(str(stockData[4]) != self.gui.cellList[10].text()[1:]):
-            self.gui.cellList[10].setText("$" + str(stockData[4]))
-            self.startLSTMThread()
+        bar = dict(zip(['date', 'open', 'high', 'low', 'close', 'volume'], stockData))
+        bar['date'] = db.date_to_epoch(bar['date'])
+
+        lastRow = self.gui.priceTableModel.lastRow()
+        if lastRow is None or bar['date'] != lastRow['date'] or bar['close'] != lastRow['close']:
+            self.gui.priceTableModel.updateLast(bar)
+            self.levelCache.update(ticker, bar)
+            self.gui.updateLastCandle()
+
+            # give the new close to the model as a live bar instead of
+            # retraining it on the whole history
+            self.lstmThread.liveUpdate(bar)
+
+            # and move the indicators forward by the same bar
+            self.indicatorCache.update(ticker, bar)
+            if self.chartIndicators is not None:
+                self.gui.updateOverlayLast(bar['date'], {output: series[-1] for output, series in
+                                                         self.chartIndicators.allSeries().items()})
 
     def populateNews(self):
 
@@ -232,72 +212,41 @@ class GuiCtrl():
                                                     color: " + fontColor)
 
     def clearTable(self):
-        for x in range(6, self.gui.numberOfCells):
-            self.gui.cellList[x].setText("")
+        self.gui.priceTableModel.clear()
 
 
+    """ shows a list of three index quotes from getIndices. Runs on the GUI
+        thread through IndexThread's signal. The labels flash for half a
+        second, a timer sets their colors back so nothing waits here """
     def updateIndexLabels(self, data):
-        self.gui.indexLabelOne.setText(data[0])
-        self.gui.indexLabelTwo.setText(data[1])
-        self.gui.indexLabelThree.setText(data[2])
-
-        # decide on the color of the label now
-        labelOneColor = None
-        labelTwoColor = None
-        labelThreeColor = None
-
-        if(data[0][3][0] == "+"):
-            labelOneColor = "#009900"
-        else:
-            labelOneColor = "#990000"
-
-        if(data[1][3][0] == "+"):
-            labelTwoColor = "#009900"
-        else:
-            labelTwoColor = "#990000"
-
-        if(data[2][3][0] == "+"):
-            labelThreeColor = "#009900"
-        else:
-            labelThreeColor = "#990000"
-
-        # update the css for each label to give them a simple flash animation
-        self.gui.indexLabelOne.setStyleSheet("font-size: 14px;\
-                                              border: none;\
-                                              background-color: rgba(255,255,255,0);\
-                                              color: " + self.updateFlashColor + ";")
-
-        self.gui.indexLabelTwo.setStyleSheet("font-size: 14px;\
-                                              border: none;\
-                                              background-color: rgba(255,255,255,0);\
-                                              color: " + self.updateFlashColor + ";")
-
-        self.gui.indexLabelThree.setStyleSheet("font-size: 14px;\
-                                                border: none;\
-                                                background-color: rgba(255,255,255,0);\
-                                                color: " + self.updateFlashColor + ";")
+        labels = [self.gui.indexLabelOne, self.gui.indexLabelTwo, self.gui.indexLabelThree]
 
-        time.sleep(.5)
-
-        # change them back to either red or green
+        # decide on the color of each label now
         # the way we will determine this is using the increase amount
         # that google provides for us. They put a '+' for green and a
-        # '-' for red
+        # '-' for red. Each quote reads "name: value change percent"
+        labelColors = []
+        for quote in data:
+            parts = quote.split()
+            if len(parts) >= 2 and parts[-2].startswith("+"):
+                labelColors.append("#009900")
+            else:
+                labelColors.append("#990000")
 
-        self.gui.indexLabelOne.setStyleSheet("font-size: 14px;\
-                                              border: none;\
-                                              background-color: rgba(255,255,255,0);\
-                                              color: " + labelOneColor)
+        # update the css for each label to give them a simple flash animation
+        for label, quote in zip(labels, data):
+            label.setText(quote)
+            self.setIndexLabelColor(label, self.updateFlashColor)
 
-        self.gui.indexLabelTwo.setStyleSheet("font-size: 14px;\
-                                              border: none;\
-                                              background-color: rgba(255,255,255,0);\
-                                              color: " + labelTwoColor)
+        # change them back to either red or green after the flash
+        QtCore.QTimer.singleShot(500, lambda: [self.setIndexLabelColor(label, color)
+                                               for label, color in zip(labels, labelColors)])
 
-        self.gui.indexLabelThree.setStyleSheet("font-size: 14px;\
-                                                border: none;\
-                                                background-color: rgba(255,255,255,0);\
-                                                color: " + labelThreeColor)
+    def setIndexLabelColor(self, label, color):
+        label.setStyleSheet("font-size: 14px;\
+                             border: none;\
+                             background-color: rgba(255,255,255,0);\
+                             color: " + color + ";")
 
     def updatePredictedPrice(self, price):
         self.gui.predictedLabel.setText("      Next Predicted Close: $" + str(round(price, 2)))
@@ -339,14 +288,17 @@ class GoButtonThread(QThread):
 
         try:
         
-            stockPrices = self.controller.getTickerPrices(ticker)
+            # get this thread's connection to the database
+            self.dbConn = db.get_connection()
+
+            # only download and write the bars we do not have yet
+            self.controller.syncTickerPrices(self.dbConn, ticker)
+
+            from NewsScraper import getNews
             self.controller.currentNews = getNews(ticker)
-        
-            # establish a connection to the database
-            self.dbConn = db.create_connection('stocksDB.db')
 
-            # put the prices in the database
-            db.insert_df(self.dbConn, ticker, stockPrices)
+            # keep the headlines, so sentiment builds up a history
+            db.insert_news(self.dbConn, ticker, self.controller.currentNews)
 
             # send the signal to update the table, update the news,
             # and start the lstm model
@@ -359,11 +311,19 @@ class GoButtonThread(QThread):
             self.gui.scanButton.setEnabled(True)
             self.errorSig.emit(errorMsg, str(e))
 
+        finally:
+            # each press runs in a new thread, so give its connection back
+            db.release_connection()
 
+
+""" Thread that keeps the stored prices of every ticker current with
+    QuoteService, at the interval the market hours call for, and checks the
+    shown ticker's news every newsInterval seconds. Tickers whose prices
+    changed are sent in one signal per refresh """
 class UpdateThread(QThread):
 
-    updateCloseSig = pyqtSignal(str)
-    updateNewsSig = pyqtSignal(str)
+    quotesChangedSig = pyqtSignal(list)
+    updateNewsSig = pyqtSignal()
     errorSig = pyqtSignal(str, str)
     
     def __init__(self, gui, ctrl):
@@ -372,37 +332,55 @@ class UpdateThread(QThread):
         self.running = True
         self.gui = gui
         self.ticker = None
+        self.quoteService = QuoteService()
+        self.newsInterval = 60
 
     def run(self):
+        # the same connection is reused on every pass of the loop
+        self.dbConn = db.get_connection()
+        nextQuoteTime = 0
+
         while(self.running):
-            time.sleep(30)
             if(self.ticker == None):
                 self.ticker = self.gui.tickerComboBox.currentText()
 
             try:
-                stockData = self.controller.getLastClose(self.ticker)
+                if time.monotonic() >= nextQuoteTime:
+                    # one batched download for every stored ticker, written
+                    # in one transaction
+                    try:
+                        changedTickers = self.quoteService.refresh(self.dbConn)
+                    finally:
+                        nextQuoteTime = time.monotonic() + self.quoteService.nextInterval()
 
-                self.dbConn = db.create_connection('stocksDB.db')
-
-                # get the last row so we know which date to use
-                lastRow = db.select_last_row(self.dbConn, self.ticker)
-                    
-                db.update_cell(self.dbConn, self.ticker, lastRow[0], stockData.iloc[-1]['Close'])
-
-                self.updateCloseSig.emit(self.ticker)
+                    if changedTickers:
+                        self.quotesChangedSig.emit(changedTickers)
 
                 # get the news also, if the last headline does not match what we have in the corresponding
-                # label widget then update it
+                # label widget then update it. The news is cached, so this
+                # only downloads and scores anything when the page changed
 
+                from NewsScraper import getNews
                 currentNews = getNews(self.ticker)
 
                 latestHeadline = currentNews['date'].iloc[0] + " " + currentNews['time'].iloc[0] + " " + currentNews['title'].iloc[0]
 
                 if latestHeadline != self.gui.headLineList[0].text():
                     self.controller.currentNews = currentNews
+                    db.insert_news(self.dbConn, self.ticker, currentNews)
                     self.updateNewsSig.emit()
             except Exception as e:
                 pass
+
+            self.pause(min(nextQuoteTime - time.monotonic(), self.newsInterval))
+
+        db.release_connection()
+
+    """ sleeps for up to seconds, waking early when the thread is stopped """
+    def pause(self, seconds):
+        wakeTime = time.monotonic() + seconds
+        while self.running and time.monotonic() < wakeTime:
+            time.sleep(max(0, min(1, wakeTime - time.monotonic())))
                 
 
 """ This thread starts when the application is launched and runs until the user
@@ -410,6 +388,7 @@ class UpdateThread(QThread):
     the S&P 500, DOW 30, and NASDAQ stock indices every few seconds """
 class IndexThread(QThread):
 
+    indexSig = pyqtSignal(list)
     errorSig = pyqtSignal(str, str)
 
     def __init__(self, ctrl):
@@ -420,20 +399,25 @@ class IndexThread(QThread):
     def run(self):
         while(self.running):
             # sleep for a random time between 10 and 20 seconds so google
-            # thinks we are a bit more human
-            sleepTime = random.randint(10, 20)
-            time.sleep(sleepTime)
-
-            
-            # get the updated information
+            # thinks we are a bit more human, a second at a time so the
+            # thread stops soon after it is told to
+            wakeTime = time.monotonic() + random.randint(10, 20)
+            while self.running and time.monotonic() < wakeTime:
+                time.sleep(1)
+            if not self.running:
+                break
+
+            # get the updated information, shared with anything else that
+            # asked for it recently. A failed fetch is tried again on the
+            # next pass
             try:
-                indexData = getIndicesGoogle()
+                indexData = getIndices()
             except Exception as e:
-                pass
+                continue
 
-            # do something with the data
+            # the labels are updated on the GUI thread
             if(indexData):
-                self.controller.updateIndexLabels(indexData)
+                self.indexSig.emit(indexData)
 
 """ This thread controls everything that happens with the
     LSTM Model for prediction """
@@ -443,42 +427,144 @@ class LSTMThread(QThread):
     predictionSig = pyqtSignal(float)
     errorSig = pyqtSignal(str, str)
 
-    def __init__(self, gui):
+    """ lookback and features are what every predictor the thread builds
+        is trained on, see LSTMPredictor """
+    def __init__(self, gui, lookback, features):
         QThread.__init__(self)
-        self.lstm = LSTMPredictor()
+        # created when a ticker is picked, so TensorFlow is not imported
+        # before the window is shown
+        self.lstm = None
         self.gui = gui
+        self.ticker = None
+        self.lookback = lookback
+        self.features = tuple(features)
+        self.registry = ModelRegistry()
+
+        # days added since the loaded model was saved, None when the model
+        # has to be trained on the whole history
+        self.newBars = None
+        self.saveAfterRun = False
+
+        # the latest live bar waiting to be given to the model
+        self.pendingBar = None
+
+        # set when the application closes during a run
+        self.stopping = False
+
+        # the last few predictors used, so switching back to a ticker
+        # does not even have to read the model from disk
+        self.recentModels = OrderedDict()
+        self.recentModelCount = 4
 
     def setStockData(self, ticker):
 
-        # reset the network so that it does a full train
-        self.lstm.initialTrain = False
+        ticker = str.upper(ticker)
+        self.ticker = ticker
+
+        from LSTM import LSTMPredictor
+
+        # reuse the predictor if this ticker was picked recently
+        if ticker in self.recentModels:
+            self.lstm = self.recentModels.pop(ticker)
+        else:
+            self.lstm = LSTMPredictor(lookback=self.lookback, features=self.features)
+        self.recentModels[ticker] = self.lstm
+        while len(self.recentModels) > self.recentModelCount:
+            self.recentModels.popitem(last=False)
         
         # create connection to database, get the data for the
         # given ticker, and then set it as the data to use for the model
-        self.dbConn = db.create_connection('stocksDB.db')
-        data = db.select_all(self.dbConn, ticker)
-        self.lstm.setStockData(data)
-        self.lstm.setTrainData()
-        self.lstm.buildNetwork()
+        self.dbConn = db.get_connection()
+        data = db.select_columns(self.dbConn, ticker, ['date'] + self.lstm.requiredColumns())
+
+        if self.lstm.network is not None:
+            # already trained in this session, only train on what is new
+            previousLastDate = self.lstm.dataVersion()['lastDate']
+            self.lstm.setStockData(data)
+            self.newBars = self.lstm.barsSince(previousLastDate)
+            if self.newBars is not None:
+                self.lstm.setTrainData(refit=False)
+        else:
+            self.lstm.setStockData(data)
+            # load a saved model if there is one, otherwise
+            # reset the network so that it does a full train
+            self.newBars = self.registry.load(ticker, self.lstm)
+
+        if self.newBars is None:
+            self.lstm.initialTrain = False
+            self.lstm.setTrainData()
+            self.lstm.buildNetwork()
+
+        # nothing to save if the loaded model was already up to date
+        self.saveAfterRun = self.newBars != 0
+        self.pendingBar = None
+
         self.readyToPredictSig.emit()
-        
+
+    """ hands a live bar to the model. If the thread is still busy the bar
+        waits and only the newest one is used """
+    def liveUpdate(self, bar):
+        self.pendingBar = bar
+        self.start()
+
+    """ asks a running training to end after its current step. The rest of
+        the run, prediction and save included, is skipped """
+    def stop(self):
+        self.stopping = True
+        if self.lstm is not None and self.lstm.network is not None:
+            self.lstm.network.stop_training = True
         
     def run(self):
         try:
             self.gui.predictedLabel.setText("              Making Prediction...")
-            self.lstm.trainNetwork()
-            previousClosePrice = self.lstm.stockData['Close'][len(self.lstm.stockData['Close'])-1]
-            predictedPrice = self.lstm.predict(previousClosePrice)
+
+            if self.newBars is None:
+                self.lstm.trainNetwork()
+            elif self.newBars > 0:
+                self.lstm.trainNewBars(self.newBars)
+            if self.stopping:
+                return
+            self.newBars = 0
+
+            if self.pendingBar is not None:
+                # a few gradient steps on the newest days only
+                bar = self.pendingBar
+                self.pendingBar = None
+                self.lstm.update(bar)
+
+            predictedPrice = self.lstm.predictNext()
             self.predictionSig.emit(predictedPrice)
+
+            # only the run that follows a ticker selection saves the model
+            if self.saveAfterRun:
+                self.saveAfterRun = False
+                self.registry.save(self.ticker, self.lstm)
         except Exception as e:
             errorMsg = "Something went wrong while making prediction"
             self.gui.predictedLabel.setText(errorMsg)
-                                
-    
 
+""" This thread runs once, right after the window is shown. It imports the
+    modules that are only needed once a ticker is picked, so the first
+    prediction and news lookup do not wait for TensorFlow and nltk """
+class WarmUpThread(QThread):
 
-        
-
+    def run(self):
+        self.load("scipy", loadLfilter)
+        self.load("nltk", self.loadNews)
+        self.load("TensorFlow", self.loadLSTM)
 
+    def load(self, name, loader):
+        startTime = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            print("Could not preload " + name + ": " + str(e))
+            return
+        print("Preloaded " + name + " in " + str(round(time.perf_counter() - startTime, 2)) + "s")
 
+    def loadNews(self):
+        from NewsScraper import getAnalyzer
+        getAnalyzer()
 
+    def loadLSTM(self):
+        import LSTM
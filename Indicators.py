@@ -0,0 +1,621 @@
+from collections import OrderedDict
+import hashlib
+import numpy as np
+
+
+"""
+    Technical indicators over the price arrays returned by
+    database_module.select_columns.
+
+    The functions at the top work on whole numpy arrays in O(n): rolling
+    windows come from differences of one cumulative sum and the exponential
+    averages (EMA, MACD, Wilder's RSI and ATR) are a single recursive
+    filter pass. Rows before an indicator has enough history are NaN.
+
+    The Indicator classes wrap the same calculations with the state needed
+    to move forward one bar at a time, so a live update does not recompute
+    the whole history. IndicatorSet keeps the output series of several
+    indicators for one ticker and IndicatorCache keeps those per ticker and
+    data version.
+
+        sma       - simple moving average
+        ema       - exponential moving average
+        rsi       - Wilder's relative strength index
+        macd      - MACD line, signal line and histogram
+        bollinger - moving average with bands width standard deviations away
+        atr       - Wilder's average true range
+        vwap      - volume weighted average price, rolling or cumulative
+"""
+
+# scipy runs the exponential smoothing recursions in C. It comes with
+# scikit-learn, but the indicators fall back to a plain loop without it.
+# It is imported on first use, since scipy.signal is slow to import
+lfilter = None
+lfilterLoaded = False
+
+""" returns scipy's lfilter, or None when scipy is not installed """
+def loadLfilter():
+    global lfilter, lfilterLoaded
+    if not lfilterLoaded:
+        try:
+            from scipy.signal import lfilter
+        except ImportError:
+            lfilter = None
+        lfilterLoaded = True
+    return lfilter
+
+""" returns y where y[i] = alpha * values[i] + (1 - alpha) * y[i - 1],
+    starting from y[-1] = initial """
+def exponentialFilter(values, alpha, initial):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.empty(0)
+
+    lfilter = loadLfilter()
+    if lfilter is not None:
+        return lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * initial])[0]
+
+    smoothed = np.empty(len(values))
+    previous = initial
+    for index, value in enumerate(values):
+        previous = alpha * value + (1 - alpha) * previous
+        smoothed[index] = previous
+    return smoothed
+
+""" sum of every period consecutive values, NaN for the first period - 1 """
+def rollingSum(values, period):
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.full(len(values), np.nan)
+    if len(values) >= period:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        sums[period - 1:] = cumulative[period:] - cumulative[:-period]
+    return sums
+
+""" mean of values, running while there are fewer than period of them and
+    smoothed with Wilder's 1 / period after that """
+def wilderAverage(values, period):
+    values = np.asarray(values, dtype=np.float64)
+    averages = np.cumsum(values) / np.arange(1, len(values) + 1)
+    if len(values) > period:
+        averages[period:] = exponentialFilter(values[period:], 1 / period, averages[period - 1])
+    return averages
+
+def sma(values, period=20):
+    return rollingSum(values, period) / period
+
+""" seeded with the first value, so there is no NaN warm up """
+def ema(values, period=20):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.empty(0)
+    return exponentialFilter(values, 2 / (period + 1), values[0])
+
+""" NaN for the first close, which has no change, and until period
+    changes have been seen """
+def rsi(closes, period=14):
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) == 0:
+        return np.empty(0)
+
+    changes = np.diff(closes)
+    averageGain = wilderAverage(np.maximum(changes, 0), period)
+    averageLoss = wilderAverage(np.maximum(-changes, 0), period)
+    values = rsiFromAverages(averageGain, averageLoss, np.arange(1, len(changes) + 1), period)
+    return np.concatenate(([np.nan], values))
+
+""" RSI of the average gains and losses after seen price changes """
+def rsiFromAverages(averageGain, averageLoss, seen, period):
+    averageGain = np.asarray(averageGain, dtype=np.float64)
+    averageLoss = np.asarray(averageLoss, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(averageLoss > 0, 100 - 100 / (1 + averageGain / averageLoss), 100.0)
+    return np.where(seen >= period, values, np.nan)
+
+""" returns (macd, signal, histogram) """
+def macd(closes, fast=12, slow=26, signal=9):
+    line = ema(closes, fast) - ema(closes, slow)
+    signalLine = ema(line, signal)
+    return line, signalLine, line - signalLine
+
+""" returns (middle, upper, lower) bands, with the population standard
+    deviation over the window """
+def bollinger(closes, period=20, width=2):
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    # shifting by the first close keeps the sum of squares from losing
+    # precision on long histories
+    shifted = closes - closes[0]
+    mean = rollingSum(shifted, period) / period
+    variance = np.maximum(rollingSum(shifted ** 2, period) / period - mean ** 2, 0)
+
+    middle = mean + closes[0]
+    deviation = width * np.sqrt(variance)
+    return middle, middle + deviation, middle - deviation
+
+""" high to low range widened to include the previous close """
+def trueRange(high, low, close):
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    previousClose = np.concatenate(([np.nan], np.asarray(close, dtype=np.float64)[:-1]))
+    return np.fmax(high, previousClose) - np.fmin(low, previousClose)
+
+def atr(high, low, close, period=14):
+    averages = wilderAverage(trueRange(high, low, close), period)
+    averages[:period - 1] = np.nan
+    return averages
+
+""" VWAP over a rolling window of period days, or over the whole history
+    when period is None """
+def vwap(high, low, close, volume, period=20):
+    volume = np.asarray(volume, dtype=np.float64)
+    typical = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64) +
+               np.asarray(close, dtype=np.float64)) / 3
+
+    if period is None:
+        priceVolume, totalVolume = np.cumsum(typical * volume), np.cumsum(volume)
+    else:
+        priceVolume, totalVolume = rollingSum(typical * volume, period), rollingSum(volume, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totalVolume > 0, priceVolume / totalVolume, np.nan)
+
+""" replaces the NaN warm up at the start of an indicator with its first
+    value and any other NaN with 0, for use as a model input """
+def fillWarmup(values):
+    values = np.array(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid):
+        values[:valid[0]] = values[valid[0]]
+    return np.nan_to_num(values)
+
+class Indicator():
+
+    name = None
+    columns = ['close']
+
+    def __init__(self):
+        # state after the last bar and after the bar before it, so the last
+        # bar can be replaced by an intraday update
+        self.state = None
+        self.previousState = None
+
+    """ identifies the indicator and its settings, e.g. sma20 """
+    def key(self):
+        return self.name
+
+    """ names of the series the indicator outputs """
+    def outputs(self):
+        return [self.key()]
+
+    """ computes every output over a dict of price arrays and keeps the
+        state after the last row. Returns a list of arrays in outputs() order """
+    def compute(self, data):
+        raise NotImplementedError
+
+    """ returns the output values for one more bar after state, and the
+        state after that bar. state is None when there is no history """
+    def next(self, state, bar):
+        raise NotImplementedError
+
+    """ moves forward one bar, a dict holding the price columns. With
+        replace the bar takes the place of the last one instead. Returns a
+        list of values in outputs() order """
+    def update(self, bar, replace=False):
+        if not replace:
+            self.previousState = self.state
+        values, self.state = self.next(self.previousState, bar)
+        return values
+
+class SMAIndicator(Indicator):
+
+    name = 'sma'
+
+    def __init__(self, period=20):
+        Indicator.__init__(self)
+        self.period = period
+
+    def key(self):
+        return self.name + str(self.period)
+
+    def compute(self, data):
+        self.state = tuple(data['close'][-self.period:])
+        return [sma(data['close'], self.period)]
+
+    def next(self, state, bar):
+        window = ((state or ()) + (float(bar['close']),))[-self.period:]
+        value = sum(window) / self.period if len(window) == self.period else np.nan
+        return [value], window
+
+class EMAIndicator(Indicator):
+
+    name = 'ema'
+
+    def __init__(self, period=20):
+        Indicator.__init__(self)
+        self.period = period
+
+    def key(self):
+        return self.name + str(self.period)
+
+    def compute(self, data):
+        values = ema(data['close'], self.period)
+        self.state = values[-1] if len(values) else None
+        return [values]
+
+    def next(self, state, bar):
+        close = float(bar['close'])
+        alpha = 2 / (self.period + 1)
+        value = close if state is None else alpha * close + (1 - alpha) * state
+        return [value], value
+
+class RSIIndicator(Indicator):
+
+    name = 'rsi'
+
+    def __init__(self, period=14):
+        Indicator.__init__(self)
+        self.period = period
+
+    def key(self):
+        return self.name + str(self.period)
+
+    def compute(self, data):
+        closes = np.asarray(data['close'], dtype=np.float64)
+        changes = np.diff(closes)
+        averageGain = wilderAverage(np.maximum(changes, 0), self.period)
+        averageLoss = wilderAverage(np.maximum(-changes, 0), self.period)
+
+        # (last close, average gain, average loss, changes seen)
+        if len(changes):
+            self.state = (closes[-1], averageGain[-1], averageLoss[-1], len(changes))
+        elif len(closes):
+            self.state = (closes[-1], 0.0, 0.0, 0)
+        else:
+            self.state = None
+
+        return [rsi(closes, self.period)]
+
+    def next(self, state, bar):
+        close = float(bar['close'])
+        if state is None:
+            return [np.nan], (close, 0.0, 0.0, 0)
+
+        previousClose, averageGain, averageLoss, seen = state
+        change = close - previousClose
+        seen += 1
+        averageGain += (max(change, 0) - averageGain) / min(seen, self.period)
+        averageLoss += (max(-change, 0) - averageLoss) / min(seen, self.period)
+
+        value = float(rsiFromAverages(averageGain, averageLoss, seen, self.period))
+        return [value], (close, averageGain, averageLoss, seen)
+
+class MACDIndicator(Indicator):
+
+    name = 'macd'
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        Indicator.__init__(self)
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    def key(self):
+        return self.name + str(self.fast) + '-' + str(self.slow) + '-' + str(self.signal)
+
+    def outputs(self):
+        return [self.key(), self.key() + '.signal', self.key() + '.histogram']
+
+    def compute(self, data):
+        closes = data['close']
+        fastLine = ema(closes, self.fast)
+        slowLine = ema(closes, self.slow)
+        line = fastLine - slowLine
+        signalLine = ema(line, self.signal)
+
+        self.state = (fastLine[-1], slowLine[-1], signalLine[-1]) if len(line) else None
+        return [line, signalLine, line - signalLine]
+
+    def next(self, state, bar):
+        close = float(bar['close'])
+        if state is None:
+            state = (close, close, 0.0)
+
+        fastAlpha = 2 / (self.fast + 1)
+        slowAlpha = 2 / (self.slow + 1)
+        signalAlpha = 2 / (self.signal + 1)
+
+        fastValue = fastAlpha * close + (1 - fastAlpha) * state[0]
+        slowValue = slowAlpha * close + (1 - slowAlpha) * state[1]
+        line = fastValue - slowValue
+        signalValue = signalAlpha * line + (1 - signalAlpha) * state[2]
+
+        return [line, signalValue, line - signalValue], (fastValue, slowValue, signalValue)
+
+class BollingerIndicator(Indicator):
+
+    name = 'bollinger'
+
+    def __init__(self, period=20, width=2):
+        Indicator.__init__(self)
+        self.period = period
+        self.width = width
+
+    def key(self):
+        return self.name + str(self.period) + '-' + str(self.width)
+
+    def outputs(self):
+        return [self.key(), self.key() + '.upper', self.key() + '.lower']
+
+    def compute(self, data):
+        self.state = tuple(data['close'][-self.period:])
+        return list(bollinger(data['close'], self.period, self.width))
+
+    def next(self, state, bar):
+        window = ((state or ()) + (float(bar['close']),))[-self.period:]
+        if len(window) < self.period:
+            return [np.nan, np.nan, np.nan], window
+
+        middle = float(np.mean(window))
+        deviation = self.width * float(np.std(window))
+        return [middle, middle + deviation, middle - deviation], window
+
+class ATRIndicator(Indicator):
+
+    name = 'atr'
+    columns = ['high', 'low', 'close']
+
+    def __init__(self, period=14):
+        Indicator.__init__(self)
+        self.period = period
+
+    def key(self):
+        return self.name + str(self.period)
+
+    def compute(self, data):
+        averages = wilderAverage(trueRange(data['high'], data['low'], data['close']), self.period)
+
+        # (last close, average true range, days seen)
+        self.state = (float(data['close'][-1]), averages[-1], len(averages)) if len(averages) else None
+
+        averages[:self.period - 1] = np.nan
+        return [averages]
+
+    def next(self, state, bar):
+        high = float(bar['high'])
+        low = float(bar['low'])
+        close = float(bar['close'])
+
+        if state is None:
+            previousClose, average, seen = None, 0.0, 0
+        else:
+            previousClose, average, seen = state
+
+        rangeHigh = high if previousClose is None else max(high, previousClose)
+        rangeLow = low if previousClose is None else min(low, previousClose)
+
+        seen += 1
+        average += (rangeHigh - rangeLow - average) / min(seen, self.period)
+
+        value = average if seen >= self.period else np.nan
+        return [value], (close, average, seen)
+
+class VWAPIndicator(Indicator):
+
+    name = 'vwap'
+    columns = ['high', 'low', 'close', 'volume']
+
+    """ period None is a cumulative VWAP over the whole history """
+    def __init__(self, period=20):
+        Indicator.__init__(self)
+        self.period = period
+
+    def key(self):
+        return self.name + (str(self.period) if self.period is not None else '')
+
+    """ typical price times volume and volume of each row """
+    def weights(self, data):
+        volume = np.asarray(data['volume'], dtype=np.float64)
+        typical = (np.asarray(data['high'], dtype=np.float64) + np.asarray(data['low'], dtype=np.float64) +
+                   np.asarray(data['close'], dtype=np.float64)) / 3
+        return typical * volume, volume
+
+    def compute(self, data):
+        priceVolume, volume = self.weights(data)
+
+        # the cumulative sums, or the window of (price x volume, volume) pairs
+        if self.period is None:
+            self.state = (float(np.sum(priceVolume)), float(np.sum(volume)))
+        else:
+            self.state = tuple(zip(priceVolume[-self.period:], volume[-self.period:]))
+
+        return [vwap(data['high'], data['low'], data['close'], data['volume'], self.period)]
+
+    def next(self, state, bar):
+        priceVolume, volume = self.weights({column: [bar[column]] for column in self.columns})
+        priceVolume, volume = float(priceVolume[0]), float(volume[0])
+
+        if self.period is None:
+            totalPriceVolume, totalVolume = state or (0.0, 0.0)
+            state = (totalPriceVolume + priceVolume, totalVolume + volume)
+            totalPriceVolume, totalVolume = state
+            full = True
+        else:
+            state = ((state or ()) + ((priceVolume, volume),))[-self.period:]
+            totalPriceVolume = sum(pair[0] for pair in state)
+            totalVolume = sum(pair[1] for pair in state)
+            full = len(state) == self.period
+
+        value = totalPriceVolume / totalVolume if full and totalVolume > 0 else np.nan
+        return [value], state
+
+INDICATORS = {indicator.name: indicator for indicator in
+              (SMAIndicator, EMAIndicator, RSIIndicator, MACDIndicator,
+               BollingerIndicator, ATRIndicator, VWAPIndicator)}
+
+""" creates an indicator by name, options go to its constructor """
+def createIndicator(name, **options):
+    if name not in INDICATORS:
+        raise ValueError("Unknown indicator: " + str(name))
+    return INDICATORS[name](**options)
+
+""" Indicators drawn over the candles on the chart, as (name, options) """
+CHART_OVERLAYS = [('sma', {'period': 20}),
+                  ('ema', {'period': 50}),
+                  ('bollinger', {'period': 20, 'width': 2})]
+
+""" The output series of several indicators for one ticker. Series are
+    stored with spare room at the end so appending a bar is O(1) """
+class IndicatorSet():
+
+    def __init__(self, indicators):
+        self.indicators = indicators
+        self.buffers = {}
+        self.dates = None
+        self.count = 0
+
+    """ price columns the indicators need """
+    def requiredColumns(self):
+        columns = []
+        for indicator in self.indicators:
+            for column in indicator.columns:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    """ computes every indicator over a dict of price arrays. The last row
+        goes through update() so it can later be replaced by a live bar """
+    def compute(self, data):
+        rows = len(data['close'])
+        capacity = max(rows * 2, 64)
+        history = {column: values[:rows - 1] for column, values in data.items()}
+
+        self.count = max(rows - 1, 0)
+        self.dates = np.zeros(capacity, dtype=np.int64)
+        if 'date' in data:
+            self.dates[:self.count] = history['date']
+
+        self.buffers = {}
+        for indicator in self.indicators:
+            for output, values in zip(indicator.outputs(), indicator.compute(history)):
+                self.buffers[output] = np.empty(capacity)
+                self.buffers[output][:self.count] = values
+
+        if rows:
+            self.append({column: values[-1] for column, values in data.items()})
+
+    """ adds one bar, a dict holding the price columns and optionally date """
+    def append(self, bar):
+        if self.count == len(self.dates):
+            self.grow()
+
+        self.dates[self.count] = bar.get('date', 0)
+        self.count += 1
+        self.write(bar, replace=False)
+
+    """ replaces the last bar, e.g. with an intraday close update """
+    def replaceLast(self, bar):
+        if self.count == 0:
+            self.append(bar)
+            return
+
+        self.dates[self.count - 1] = bar.get('date', self.dates[self.count - 1])
+        self.write(bar, replace=True)
+
+    def write(self, bar, replace):
+        for indicator in self.indicators:
+            for output, value in zip(indicator.outputs(), indicator.update(bar, replace)):
+                self.buffers[output][self.count - 1] = value
+
+    """ doubles the room for new bars """
+    def grow(self):
+        capacity = len(self.dates) * 2
+        self.dates = np.resize(self.dates, capacity)
+        for output in self.buffers:
+            self.buffers[output] = np.resize(self.buffers[output], capacity)
+
+    def lastDate(self):
+        return int(self.dates[self.count - 1]) if self.count else None
+
+    """ returns the dates of the series as a view, oldest first """
+    def dateSeries(self):
+        return self.dates[:self.count]
+
+    """ returns an output series as a view, oldest first """
+    def series(self, output):
+        return self.buffers[output][:self.count]
+
+    """ returns every output series as a dict """
+    def allSeries(self):
+        return {output: self.series(output) for output in self.buffers}
+
+"""
+    Keeps an IndicatorSet per ticker and list of indicators, up to
+    maxEntries of them. get() returns the cached series when the price data
+    has not changed, only computes the new bars when days were added after
+    the cached ones, and recomputes everything otherwise. update() moves
+    every cached set of a ticker forward with a live bar.
+"""
+
+""" digest of the first rows of every column in a dict of price arrays.
+    The indicators carry state from every bar before the last, so a cached
+    set is only good while these rows are unchanged """
+def historyDigest(data, rows):
+    digest = hashlib.blake2b(digest_size=16)
+    for column in sorted(data):
+        digest.update(np.ascontiguousarray(data[column][:rows]).tobytes())
+    return digest.digest()
+
+class IndicatorCache():
+
+    def __init__(self, maxEntries=16):
+        # {(ticker, indicator keys): IndicatorSet}
+        self.entries = OrderedDict()
+        # {(ticker, indicator keys): (rows, historyDigest of those rows)}
+        self.versions = {}
+        self.maxEntries = maxEntries
+
+    """ returns the IndicatorSet for a ticker over a dict of price arrays
+        holding date and the columns the indicators need. specs is a list
+        of (name, options) """
+    def get(self, ticker, data, specs=CHART_OVERLAYS):
+        indicators = [createIndicator(name, **options) for name, options in specs]
+        cacheKey = (str.upper(ticker), tuple(indicator.key() for indicator in indicators))
+
+        indicatorSet = self.entries.pop(cacheKey, None)
+        rows, digest = self.versions.pop(cacheKey, (0, None))
+        dates = data['date']
+
+        if indicatorSet is None or indicatorSet.count == 0 or indicatorSet.count > len(dates) or \
+           dates[indicatorSet.count - 1] != indicatorSet.lastDate() or historyDigest(data, rows) != digest:
+            # nothing cached, or the stored history changed underneath it,
+            # an older day edited or backfilled included
+            indicatorSet = IndicatorSet(indicators)
+            indicatorSet.compute(data)
+        else:
+            # the last cached bar may have been a live one, so it is
+            # replaced with the stored row before the new days are added
+            indicatorSet.replaceLast({column: values[indicatorSet.count - 1] for column, values in data.items()})
+            for row in range(indicatorSet.count, len(dates)):
+                indicatorSet.append({column: values[row] for column, values in data.items()})
+
+        # the last row may still be replaced by a live bar
+        self.entries[cacheKey] = indicatorSet
+        self.versions[cacheKey] = (len(dates) - 1, historyDigest(data, len(dates) - 1))
+        while len(self.entries) > self.maxEntries:
+            self.versions.pop(self.entries.popitem(last=False)[0])
+
+        return indicatorSet
+
+    """ gives a live bar to every cached set of a ticker. A bar with the
+        same date as the last cached one replaces it """
+    def update(self, ticker, bar):
+        for (cachedTicker, keys), indicatorSet in self.entries.items():
+            if cachedTicker != str.upper(ticker):
+                continue
+
+            if bar.get('date') == indicatorSet.lastDate():
+                indicatorSet.replaceLast(bar)
+            else:
+                indicatorSet.append(bar)
@@ -1,69 +1,232 @@
-import pandas as pd
 import numpy as np
+from Predictors import makeWindows
+from Features import FEATURES, FEATURE_WARMUP, DEFAULT_FEATURES, requiredColumns
+from NetworkPresets import NETWORK_PRESETS, DEFAULT_PRESET, DEFAULT_LOOKBACK
 from sklearn.preprocessing import MinMaxScaler
 from keras import models, layers
 from keras.models import Sequential
 from keras.layers import Dense, Dropout, LSTM
 
+""" A fixed size buffer of the most recent rows of a (rows, width) array.
+    Storage is allocated once. Every row is written twice, capacity rows
+    apart, so the newest rows can always be read as one contiguous view
+    without copying or reordering """
+class RingBuffer():
+
+    def __init__(self, capacity, width, dtype=np.float64):
+        self.capacity = capacity
+        self.data = np.zeros((capacity * 2, width), dtype=dtype)
+        self.end = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    """ adds a row, dropping the oldest one once the buffer is full """
+    def append(self, row):
+        position = self.end % self.capacity
+        self.data[position] = row
+        self.data[position + self.capacity] = row
+        self.end = position + 1
+        self.count = min(self.count + 1, self.capacity)
+
+    """ overwrites the newest row """
+    def replaceLast(self, row):
+        position = (self.end - 1) % self.capacity
+        self.data[position] = row
+        self.data[position + self.capacity] = row
+
+    """ returns the stored rows, oldest first, as a view """
+    def view(self):
+        start = self.end + self.capacity - self.count
+        return self.data[start:start + self.count]
+
+    """ returns the newest row """
+    def last(self):
+        return self.data[self.end + self.capacity - 1]
+
 class LSTMPredictor():
 
-    def __init__(self):
+    """ preset is a key of NETWORK_PRESETS, lookback is how many days the
+        network sees per sample, horizon is how many days ahead it predicts
+        the close and features are keys of FEATURES """
+    def __init__(self, preset=DEFAULT_PRESET, lookback=DEFAULT_LOOKBACK, horizon=1, features=DEFAULT_FEATURES):
+        if preset not in NETWORK_PRESETS:
+            raise ValueError("Unknown network preset: " + str(preset))
+        for feature in features:
+            if feature not in FEATURES:
+                raise ValueError("Unknown feature: " + str(feature))
+
+        self.preset = preset
+        self.lookback = lookback
+        self.horizon = horizon
+        self.features = tuple(features)
         self.stockData = None
+        self.dates = None
+        self.prices = None
+        self.closes = None
         self.trainData = None
         self.xTrain = None
         self.yTrain = None
         self.network = None
         self.initialTrain = False
         self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self.targetScaler = MinMaxScaler(feature_range=(0, 1))
+
+        # online training on live updates, see update()
+        # onlineWindows is how many of the newest windows each gradient
+        # step is taken on and onlineSteps how many steps each update takes
+        self.online = None
+        self.onlineWindows = 32
+        self.onlineSteps = 2
 
+    """ returns the price columns that have to be read from the database
+        to build this predictor's features """
+    def requiredColumns(self):
+        return requiredColumns(self.features)
+
+    """ how many days the indicator features need before they settle """
+    def warmup(self):
+        return max([FEATURE_WARMUP.get(feature, 0) for feature in self.features])
+
+    """ builds the (rows, features) float32 input array from a dict of
+        price arrays """
+    def buildFeatures(self, data):
+        prices = {column: np.asarray(data[column], dtype=np.float64) for column in self.requiredColumns()}
+
+        featureData = np.empty((len(prices['close']), len(self.features)), dtype=np.float32)
+        for index, feature in enumerate(self.features):
+            featureData[:, index] = FEATURES[feature][1](prices)
+        return featureData
+
+    """ data is a dict of numpy arrays from database_module.select_columns
+        holding at least the columns from requiredColumns() """
     def setStockData(self, data):
-        self.stockData = data
+        self.dates = np.asarray(data['date'], dtype=np.int64) if 'date' in data else None
+        self.prices = {column: np.asarray(data[column], dtype=np.float64) for column in self.requiredColumns()}
+        self.closes = self.prices['close']
+        self.stockData = self.buildFeatures(self.prices)
 
-        # delete all of the columns that we do not need
-        del(self.stockData['Date'])
-        del(self.stockData['Open'])
-        del(self.stockData['High'])
-        del(self.stockData['Low'])
-        del(self.stockData['Volume'])
+        # any live updates belonged to the old data
+        self.online = None
+
+    """ the settings a saved model has to match to be reused """
+    def config(self):
+        return {'preset': self.preset,
+                'lookback': self.lookback,
+                'horizon': self.horizon,
+                'features': list(self.features)}
+
+    """ identifies the stock data the model was last trained on """
+    def dataVersion(self):
+        return {'lastDate': int(self.dates[-1]) if self.dates is not None else None,
+                'rows': len(self.closes)}
+
+    """ returns how many stored days come after lastDate, or None if the
+        stock data does not reach back to lastDate """
+    def barsSince(self, lastDate):
+        if self.dates is None or lastDate is None or self.dates[-1] < lastDate:
+            return None
+        return int(len(self.dates) - np.searchsorted(self.dates, lastDate, side='right'))
+
+    """ builds the training windows. Sample i is the lookback rows starting
+        at row i and its target is the close horizon days after the window.
+        With refit False the scalers keep the fit they were loaded with """
+    def setTrainData(self, refit=True):
 
-    def setTrainData(self):
-        
         # train on 100% of the data
-        self.trainStockData = self.stockData[0:len(self.stockData)]
+        if refit:
+            self.scaler.fit(self.stockData)
+            self.targetScaler.fit(self.closes.reshape(-1, 1))
 
-        self.trainStockData = np.array(self.trainStockData)
+        self.cacheScalerParams()
 
-        self.xTrain = []
-        self.yTrain = []
+        scaledData = self.scaler.transform(self.stockData).astype(np.float32)
+        scaledCloses = self.targetScaler.transform(self.closes.reshape(-1, 1)).astype(np.float32)
 
-        for count in range(0, len(self.trainStockData)-1):
-            self.xTrain.append(self.trainStockData[count])
-            self.yTrain.append(self.trainStockData[count+1])
+        # the last horizon rows have no target yet so they are left out
+        self.trainData = scaledData[:len(scaledData) - self.horizon]
+        self.xTrain = makeWindows(self.trainData, self.lookback)
+        self.yTrain = scaledCloses[self.lookback + self.horizon - 1:]
 
-        self.xTrain = np.array(self.xTrain)
-        self.xTrain = self.scaler.fit_transform(self.xTrain)
-        self.xTrain = self.xTrain.reshape(-1, 1, 1)
+    """ returns the training windows as a batched, prefetching tf.data
+        pipeline. The windows are cut out of the scaled array as batches are
+        needed, so memory stays bounded however long the history is """
+    def getTrainDataset(self, batchSize=32, shuffle=True):
+        import tensorflow as tf
 
-        self.yTrain = np.array(self.yTrain)
-        self.yTrain = self.scaler.fit_transform(self.yTrain)
-        self.yTrain = self.yTrain.reshape(-1, 1, 1)
+        dataset = tf.keras.preprocessing.timeseries_dataset_from_array(
+            self.trainData, self.yTrain, sequence_length=self.lookback,
+            batch_size=batchSize, shuffle=shuffle)
+        return dataset.prefetch(tf.data.experimental.AUTOTUNE)
 
-        # ensure that xTrain and yTrain are the same length
-        if(self.xTrain.shape[0] != self.yTrain.shape[0]):
-            self.xTrain = np.delete(self.xTrain, len(self.xTrain)-1, 0)
+    """ starts online mode by copying the newest days of stock data into a
+        ring buffer. The buffer holds just enough days for onlineWindows
+        training windows and the indicator warm up, so every update costs
+        the same however long the history is """
+    def startOnline(self):
+        columns = ['date'] + self.requiredColumns()
+        capacity = self.onlineWindows + self.lookback + self.horizon + self.warmup()
 
-    """ appends a new price to the training data """
-    def appendToTrain(self, data):
-        self.stockData = self.stockData.append(pd.DataFrame([data], columns=['Close']), ignore_index=True)
+        self.online = RingBuffer(capacity, len(columns))
+        dates = self.dates if self.dates is not None else np.zeros(len(self.closes))
+        for index in range(max(0, len(self.closes) - capacity), len(self.closes)):
+            self.online.append([dates[index]] + [self.prices[column][index] for column in columns[1:]])
 
+    """ takes one live bar, a dict holding date and the columns from
+        requiredColumns(). A bar with the same date as the newest stored day
+        replaces it (an intraday close update), otherwise it is a new day.
+        Then takes onlineSteps gradient steps on the newest windows only """
+    def update(self, bar):
+        if self.online is None:
+            self.startOnline()
+
+        columns = ['date'] + self.requiredColumns()
+        row = [float(bar.get(column, self.online.last()[index])) for index, column in enumerate(columns)]
+
+        if row[0] == self.online.last()[0]:
+            self.online.replaceLast(row)
+        else:
+            self.online.append(row)
+
+        # rebuild the features of the buffered days and scale them with the
+        # scalers from the full train, they are not refit here
+        # the indicator warm up days are only there to settle the features
+        recent = self.onlineData()
+        warmup = min(self.warmup(), max(len(self.online) - self.onlineWindows - self.lookback - self.horizon, 0))
+        features = self.buildFeatures(recent)[warmup:]
+        features *= self.inputScale
+        features += self.inputOffset
+        targets = recent['close'][warmup:].reshape(-1, 1) * self.targetScale + self.targetOffset
+
+        xOnline = makeWindows(features[:len(features) - self.horizon], self.lookback)
+        yOnline = targets[self.lookback + self.horizon - 1:].astype(np.float32)
+        if len(xOnline) == 0:
+            return
+
+        xOnline = np.ascontiguousarray(xOnline)
+        for step in range(self.onlineSteps):
+            self.network.train_on_batch(xOnline, yOnline)
+
+    """ returns the ring buffer as a dict of column views """
+    def onlineData(self):
+        recent = self.online.view()
+        columns = ['date'] + self.requiredColumns()
+        return {column: recent[:, index] for index, column in enumerate(columns)}
+
+    """ builds the network from the layer stack of the chosen preset """
     def buildNetwork(self):
         
         self.network = Sequential()
-        self.network.add(Dense(10000, activation='relu',
-                               input_shape=(self.xTrain.shape[1], self.xTrain.shape[2])))
-        self.network.add(LSTM(1000, activation='relu', return_sequences=True))
-        self.network.add(Dropout(.9))
-        self.network.add(Dense(1))
+        self.network.add(layers.InputLayer(input_shape=(self.xTrain.shape[1], self.xTrain.shape[2])))
+
+        for layerType, units, options in NETWORK_PRESETS[self.preset]:
+            if layerType == 'dense':
+                self.network.add(Dense(units, **options))
+            elif layerType == 'lstm':
+                self.network.add(LSTM(units, **options))
+            elif layerType == 'dropout':
+                self.network.add(Dropout(units))
 
         self.network.compile(optimizer='adam', loss='mse', metrics=['acc'])
 
@@ -74,27 +237,63 @@ class LSTMPredictor():
         else:
             epochNum = 1
             
-        self.network.fit(self.xTrain, self.yTrain, epochs=epochNum, verbose=0)
+        self.network.fit(self.getTrainDataset(), epochs=epochNum, verbose=0)
 
+    """ warm starts a loaded model on only the samples whose targets are
+        among the last newBars days """
+    def trainNewBars(self, newBars, epochs=1):
+        newBars = min(newBars, len(self.yTrain))
+        if newBars <= 0:
+            return
 
-    """ d parameter is the last close price that is used to predict
-        the next close price """
+        self.network.fit(np.ascontiguousarray(self.xTrain[-newBars:]), self.yTrain[-newBars:],
+                         epochs=epochs, verbose=0)
+
+
+    """ d is what the prediction is made from. It can be a single close
+        price (for a one day, close only predictor), a list of
+        closes to predict from each of them, or a batch of
+        (count, lookback, features) windows of unscaled feature rows.
+        Returns one predicted close for a single input, otherwise an array """
     def predict(self, d):
 
-        predictData = np.array(float(d))
-        predictData = predictData.reshape(-1, 1)
-        predictData = self.scaler.fit_transform(predictData)
-        predictData = predictData.reshape(-1, 1, 1)
+        windows = np.asarray(d, dtype=np.float32)
+        if windows.ndim < 3:
+            windows = windows.reshape(-1, self.lookback, len(self.features))
 
-        prediction = self.network.predict(predictData)
-        prediction = prediction.reshape(-1, 1)
-        prediction = self.scaler.inverse_transform(prediction)
+        prediction = self.predictWindows(windows)
 
-        return prediction[0][0]
+        return prediction[0] if np.ndim(d) == 0 else prediction
 
+    """ copies the fitted scalers into plain float32 arrays so predictions
+        can be scaled without going through sklearn. MinMaxScaler scales as
+        x * scale_ + min_ """
+    def cacheScalerParams(self):
+        self.inputScale = self.scaler.scale_.astype(np.float32)
+        self.inputOffset = self.scaler.min_.astype(np.float32)
+        self.targetScale = float(self.targetScaler.scale_[0])
+        self.targetOffset = float(self.targetScaler.min_[0])
 
-    
+    """ predicts the close horizon days after each of a batch of
+        (count, lookback, features) windows of unscaled feature rows. The
+        scalers are only applied, never refit, and the whole batch goes
+        through the network in one call """
+    def predictWindows(self, windows):
+        scaled = np.multiply(windows, self.inputScale, dtype=np.float32)
+        scaled += self.inputOffset
 
-        
-        
-            
+        prediction = np.asarray(self.network.predict_on_batch(scaled)).reshape(-1)
+
+        # undo the target scaling in place
+        prediction -= self.targetOffset
+        prediction /= self.targetScale
+        return prediction
+
+    """ predicts the close horizon days after the last stored day, or the
+        last live bar when online updates have been made """
+    def predictNext(self):
+        if self.online is not None:
+            features = self.buildFeatures(self.onlineData())
+            return float(self.predictWindows(features[np.newaxis, -self.lookback:])[0])
+
+        return float(self.predictWindows(self.stockData[np.newaxis, -self.lookback:])[0])
@@ -0,0 +1,102 @@
+import json
+import os
+import pickle
+import shutil
+import time
+
+"""
+    Saves trained LSTMPredictor models to disk so a ticker does not have to
+    be trained from scratch every time it is selected. Each ticker gets its
+    own folder holding a metadata file with the predictor settings and the
+    data version the model was trained up to. Every save writes the network
+    weights and the fitted scalers into a new version folder, which the
+    metadata names.
+
+    models/
+        ADI/
+            meta.json
+            1760824896123456789/
+                weights.h5
+                scalers.pkl
+"""
+
+class ModelRegistry():
+
+    def __init__(self, directory='models'):
+        self.directory = directory
+
+    def tickerPath(self, ticker):
+        return os.path.join(self.directory, str.upper(ticker))
+
+    """ saves a trained predictor for a ticker. The weights and scalers go
+        into a new version folder and the metadata naming it replaces the
+        old one in a single os.replace, so load sees either the old save or
+        the new one, never files from both """
+    def save(self, ticker, lstm):
+        path = self.tickerPath(ticker)
+        version = str(time.time_ns())
+        versionPath = os.path.join(path, version)
+        os.makedirs(versionPath)
+
+        lstm.network.save_weights(os.path.join(versionPath, 'weights.h5'))
+
+        with open(os.path.join(versionPath, 'scalers.pkl'), 'wb') as scalerFile:
+            pickle.dump({'scaler': lstm.scaler, 'targetScaler': lstm.targetScaler}, scalerFile)
+
+        meta = {'config': lstm.config(),
+                'dataVersion': lstm.dataVersion(),
+                'version': version,
+                'saved': int(time.time())}
+
+        tempPath = os.path.join(path, 'meta.' + version + '.tmp')
+        with open(tempPath, 'w') as metaFile:
+            json.dump(meta, metaFile)
+        os.replace(tempPath, os.path.join(path, 'meta.json'))
+
+        # older versions are no longer named by the metadata. One still
+        # open by a load is left for the next save to remove
+        for name in os.listdir(path):
+            if name != version and os.path.isdir(os.path.join(path, name)):
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    """ returns the saved metadata for a ticker, or None if there is no
+        saved model or it was built with different predictor settings """
+    def loadMeta(self, ticker, lstm):
+        metaPath = os.path.join(self.tickerPath(ticker), 'meta.json')
+        if not os.path.exists(metaPath):
+            return None
+
+        with open(metaPath) as metaFile:
+            meta = json.load(metaFile)
+
+        if meta['config'] != lstm.config():
+            return None
+        return meta
+
+    """ loads the saved weights and scalers for a ticker into a predictor
+        whose stock data has already been set. Returns the number of days
+        added since the model was saved, or None if there is no usable
+        saved model and the predictor has to be trained from scratch """
+    def load(self, ticker, lstm):
+        meta = self.loadMeta(ticker, lstm)
+        if meta is None:
+            return None
+
+        # the stored data was replaced with something older than the model
+        newBars = lstm.barsSince(meta['dataVersion']['lastDate'])
+        if newBars is None:
+            return None
+
+        # saves from before version folders keep their files next to the metadata
+        path = os.path.join(self.tickerPath(ticker), meta.get('version', ''))
+        with open(os.path.join(path, 'scalers.pkl'), 'rb') as scalerFile:
+            scalers = pickle.load(scalerFile)
+
+        lstm.scaler = scalers['scaler']
+        lstm.targetScaler = scalers['targetScaler']
+        lstm.setTrainData(refit=False)
+        lstm.buildNetwork()
+        lstm.network.load_weights(os.path.join(path, 'weights.h5'))
+        lstm.initialTrain = True
+
+        return newBars
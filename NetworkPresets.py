@@ -0,0 +1,33 @@
+""" Layer stacks the LSTM predictor can be built with. Each layer is a
+    (type, units, options) tuple. The last recurrent layer returns only its
+    final state so every preset outputs one value per sample.
+
+    original - the network the project started with, about 44 million
+               parameters for a single close feature
+    small    - two stacked LSTMs with light dropout, about 30 thousand
+    compact  - a single small LSTM, meant for fast training on CPU
+
+    Kept apart from LSTM.py so the command line tools can read the presets
+    without importing TensorFlow. """
+NETWORK_PRESETS = {
+    'original': [('dense', 10000, {'activation': 'relu'}),
+                 ('lstm', 1000, {'activation': 'relu'}),
+                 ('dropout', .9, {}),
+                 ('dense', 1, {})],
+    'small': [('lstm', 64, {'return_sequences': True}),
+              ('lstm', 32, {}),
+              ('dropout', .1, {}),
+              ('dense', 1, {})],
+    'compact': [('lstm', 32, {}),
+                ('dense', 1, {})],
+}
+
+# the preset the GUI and batch_predict.py use. small has about a thousandth
+# of original's parameters, so it trains far faster on a CPU. Run
+# benchmark_lstm.py to compare the presets on the stored data
+DEFAULT_PRESET = 'small'
+
+# days of features the network sees per sample, about a trading month.
+# Enough for the recurrent layers to pick up short trends, while a year of
+# history still gives over two hundred training windows
+DEFAULT_LOOKBACK = 20
@@ -1,50 +1,139 @@
-import requests
+from YahooStockGrab import getSession
 from bs4 import BeautifulSoup
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-nltk.download('vader_lexicon')
 import pandas as pd
+import hashlib
+import threading
+import time
+
+# lxml parses the page several times faster than the pure python parser
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 """
     Using finviz.com and an input ticker, headlines and time stamps are loaded into a dictionary, which sentiment analysis is then performed on.
+
+    Pages are cached per ticker. Within NEWS_CACHE_SECONDS the cached
+    headlines are returned without a request, after that the page is
+    fetched with a conditional GET and only parsed when it changed. Scores
+    are kept per ticker by headline hash, so only new headlines go through
+    the one shared VADER analyzer. nltk is only imported when that
+    analyzer is first needed, and its lexicon is only downloaded when it
+    is not installed yet.
 """
 
-def getNews(ticker):
-    
-    urlstart = 'https://finviz.com/quote.ashx?t='
-    newsData = {}
-    dataDictionary = {}
+NEWS_URL = 'https://finviz.com/quote.ashx?t='
+
+NEWS_CACHE_SECONDS = 60
+
+# {ticker: {'time', 'etag', 'lastModified', 'pageHash', 'frame', 'scores'}}
+newsCache = {}
+newsCacheLock = threading.Lock()
+
+analyzer = None
+analyzerLock = threading.Lock()
+
+""" returns the VADER analyzer shared by every call, loading its lexicon
+    only once """
+def getAnalyzer():
+    global analyzer
+    with analyzerLock:
+        if analyzer is None:
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            ensureLexicon()
+            analyzer = SentimentIntensityAnalyzer()
+    return analyzer
+
+""" downloads the VADER lexicon, only when it is not already on disk """
+def ensureLexicon():
+    import nltk
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+
+def headlineHash(title):
+    return hashlib.sha1(title.encode('utf-8')).hexdigest()
+
+def getNews(ticker, maxAge=NEWS_CACHE_SECONDS):
+
+    ticker = str.upper(ticker)
+
+    with newsCacheLock:
+        entry = dict(newsCache.get(ticker, {}))
 
-    url = urlstart + ticker
-    req = requests.get(url=url, headers={'user-agent': 'Mozilla/5.0'})
-    soup = BeautifulSoup(req.text, 'html.parser')
+    if entry and time.monotonic() - entry['time'] < maxAge:
+        return entry['frame']
+
+    # ask for the page only if it changed since the cached copy
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('lastModified'):
+        headers['If-Modified-Since'] = entry['lastModified']
+
+    req = getSession().get(url=NEWS_URL + ticker, headers=headers, timeout=15)
+
+    if req.status_code == 304 and entry:
+        return storeNews(ticker, entry)
+
+    req.raise_for_status()
+
+    entry['etag'] = req.headers.get('ETag')
+    entry['lastModified'] = req.headers.get('Last-Modified')
+
+    # servers that ignore the conditional headers send the same page again
+    pageHash = hashlib.sha1(req.content).hexdigest()
+    if entry.get('pageHash') == pageHash:
+        return storeNews(ticker, entry)
+    entry['pageHash'] = pageHash
+
+    soup = BeautifulSoup(req.text, HTML_PARSER)
     newsData = soup.find(id='news-table')
-    dataDictionary[ticker] = newsData 
-            
 
     newsList = []
+    date = ''
 
-    for ticker, newsData in dataDictionary.items():
-            for row in newsData.findAll('tr'):
-                    title = row.a.get_text()
-                    timestamp = row.td.text.split(' ')
-                    if len(timestamp) == 1:
-                        time = timestamp[0]
-                    else:
-                        date =  timestamp[0]
-                        time = timestamp [1]
-                        
-                    newsList.append([date,time[:7],title])
-                    
-    dataframe = pd.DataFrame(newsList, columns=['date','time','title'])
-    vader = SentimentIntensityAnalyzer()
+    for row in newsData.findAll('tr'):
+        title = row.a.get_text()
+        timestamp = row.td.text.split(' ')
+        if len(timestamp) == 1:
+            newsTime = timestamp[0]
+        else:
+            date =  timestamp[0]
+            newsTime = timestamp [1]
+
+        newsList.append([date,newsTime[:7],title])
 
-    narrow = lambda title: vader.polarity_scores(title)['compound']
-    dataframe['compound'] = dataframe['title'].apply(narrow)
-    
-    return dataframe.head(50)
+        # only the first 50 headlines are shown
+        if len(newsList) == 50:
+            break
+
+    dataframe = pd.DataFrame(newsList, columns=['date','time','title'])
 
+    # score only the headlines that were not on the page last time, in
+    # one pass with the shared analyzer
+    oldScores = entry.get('scores', {})
+    hashes = [headlineHash(title) for title in dataframe['title']]
+    vader = getAnalyzer()
 
+    scores = {}
+    for titleHash, title in zip(hashes, dataframe['title']):
+        if titleHash not in scores:
+            scores[titleHash] = oldScores[titleHash] if titleHash in oldScores else \
+                                vader.polarity_scores(title)['compound']
 
+    dataframe['compound'] = [scores[titleHash] for titleHash in hashes]
 
+    entry['frame'] = dataframe
+    entry['scores'] = scores
+    return storeNews(ticker, entry)
 
+""" saves a ticker's cache entry as fetched now and returns its headlines """
+def storeNews(ticker, entry):
+    entry['time'] = time.monotonic()
+    with newsCacheLock:
+        newsCache[ticker] = entry
+    return entry['frame']
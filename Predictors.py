@@ -0,0 +1,230 @@
+import time
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+"""
+    Common interface for every forecasting backend, so the GUI, the batch
+    scripts and the evaluation tools can swap a cheap model for the LSTM.
+
+    A predictor is fit on a dict of price arrays (the output of
+    database_module.select_columns) and predicts the next close. observe()
+    swaps in newer data without refitting, which is how a fitted model is
+    moved forward one day at a time.
+
+    Backends:
+        naive - tomorrow's close is today's close, the baseline to beat
+        ar    - linear autoregression on daily log returns, numpy only
+        ets   - Holt's linear exponential smoothing, numpy only
+        gbm   - scikit-learn gradient boosting on lagged returns
+        lstm  - the LSTMPredictor network (needs TensorFlow)
+"""
+
+""" returns a read only (count, lookback, features) view of every window
+    of lookback consecutive rows in a (rows, features) array. The windows
+    share memory with the array, nothing is copied """
+def makeWindows(array, lookback):
+    array = np.ascontiguousarray(array)
+    count = array.shape[0] - lookback + 1
+    if count <= 0:
+        return np.empty((0, lookback) + array.shape[1:], dtype=array.dtype)
+
+    return as_strided(array, shape=(count, lookback) + array.shape[1:],
+                      strides=(array.strides[0],) + array.strides, writeable=False)
+
+class Predictor():
+
+    name = None
+
+    def __init__(self):
+        self.data = None
+
+    """ price columns the backend needs """
+    def requiredColumns(self):
+        return ['close']
+
+    """ trains on a dict of price arrays """
+    def fit(self, data):
+        raise NotImplementedError
+
+    """ replaces the data predictions are made from without refitting.
+        newRows is how many days were added since the last fit or observe,
+        when the caller knows it """
+    def observe(self, data, newRows=None):
+        self.data = data
+
+    """ predicts the close after the last observed day """
+    def predictNext(self):
+        raise NotImplementedError
+
+class NaivePredictor(Predictor):
+
+    name = 'naive'
+
+    def fit(self, data):
+        self.data = data
+
+    def predictNext(self):
+        return float(self.data['close'][-1])
+
+class LinearARPredictor(Predictor):
+
+    name = 'ar'
+
+    """ lags is how many past daily log returns the next one is regressed on """
+    def __init__(self, lags=5):
+        Predictor.__init__(self)
+        self.lags = lags
+        self.coefficients = None
+
+    def fit(self, data):
+        self.data = data
+        returns = np.diff(np.log(np.asarray(data['close'], dtype=np.float64)))
+
+        # each row of the design matrix is lags returns plus an intercept,
+        # the target is the return that followed them
+        lagged = makeWindows(returns[:-1].reshape(-1, 1), self.lags)[:, :, 0]
+        design = np.hstack((lagged, np.ones((len(lagged), 1))))
+        self.coefficients = np.linalg.lstsq(design, returns[self.lags:], rcond=None)[0]
+
+    def predictNext(self):
+        closes = self.data['close']
+        returns = np.diff(np.log(np.asarray(closes[-self.lags - 1:], dtype=np.float64)))
+        nextReturn = np.dot(returns, self.coefficients[:-1]) + self.coefficients[-1]
+        return float(closes[-1] * np.exp(nextReturn))
+
+class ExpSmoothingPredictor(Predictor):
+
+    name = 'ets'
+
+    """ alpha smooths the level and beta smooths the trend """
+    def __init__(self, alpha=.5, beta=.1):
+        Predictor.__init__(self)
+        self.alpha = alpha
+        self.beta = beta
+
+    """ runs the smoothing over closes, starting from a level and trend """
+    def smooth(self, closes, level, trend):
+        for close in closes:
+            previousLevel = level
+            level = self.alpha * close + (1 - self.alpha) * (level + trend)
+            trend = self.beta * (level - previousLevel) + (1 - self.beta) * trend
+        return level, trend
+
+    def fit(self, data):
+        self.data = data
+        closes = np.asarray(data['close'], dtype=np.float64)
+        self.level, self.trend = self.smooth(closes[1:], closes[0], closes[1] - closes[0])
+        self.smoothedRows = len(closes)
+
+    """ carries the level and trend forward over just the new days """
+    def observe(self, data, newRows=None):
+        self.data = data
+        if newRows is None:
+            newRows = len(data['close']) - self.smoothedRows
+
+        if newRows > 0:
+            self.level, self.trend = self.smooth(data['close'][-newRows:], self.level, self.trend)
+        self.smoothedRows = len(data['close'])
+
+    def predictNext(self):
+        return float(self.level + self.trend)
+
+class GradientBoostingPredictor(Predictor):
+
+    name = 'gbm'
+
+    def __init__(self, lags=10, estimators=100):
+        Predictor.__init__(self)
+        self.lags = lags
+        self.estimators = estimators
+        self.model = None
+
+    """ (rows, lags) matrix of lagged log returns and the return after each row """
+    def lagFeatures(self, closes):
+        returns = np.diff(np.log(np.asarray(closes, dtype=np.float64)))
+        return makeWindows(returns.reshape(-1, 1), self.lags)[:, :, 0], returns
+
+    def fit(self, data):
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        self.data = data
+        lagged, returns = self.lagFeatures(data['close'])
+        self.model = GradientBoostingRegressor(n_estimators=self.estimators, max_depth=3)
+        self.model.fit(lagged[:-1], returns[self.lags:])
+
+    def predictNext(self):
+        closes = self.data['close']
+        lagged, returns = self.lagFeatures(closes[-self.lags - 1:])
+        nextReturn = self.model.predict(lagged[-1:])[0]
+        return float(closes[-1] * np.exp(nextReturn))
+
+class LSTMBackend(Predictor):
+
+    name = 'lstm'
+
+    """ options are passed to LSTMPredictor (preset, lookback, horizon, features) """
+    def __init__(self, **options):
+        Predictor.__init__(self)
+        from LSTM import LSTMPredictor
+        self.lstm = LSTMPredictor(**options)
+
+    def requiredColumns(self):
+        return self.lstm.requiredColumns()
+
+    def fit(self, data):
+        self.data = data
+        self.lstm.initialTrain = False
+        self.lstm.setStockData(data)
+        self.lstm.setTrainData()
+        self.lstm.buildNetwork()
+        self.lstm.trainNetwork()
+
+    def observe(self, data, newRows=None):
+        self.data = data
+        self.lstm.setStockData(data)
+
+    def predictNext(self):
+        return self.lstm.predictNext()
+
+BACKENDS = {backend.name: backend for backend in
+            (NaivePredictor, LinearARPredictor, ExpSmoothingPredictor,
+             GradientBoostingPredictor, LSTMBackend)}
+
+""" creates a predictor by backend name, options go to its constructor """
+def createPredictor(name, **options):
+    if name not in BACKENDS:
+        raise ValueError("Unknown predictor backend: " + str(name))
+    return BACKENDS[name](**options)
+
+"""
+    Walk-forward evaluation. From row start up to row end, the predictor
+    predicts every close using only the days before it. It is refit every
+    refitEvery rows and moved forward one day with observe() in between.
+    With trainWindow set only that many of the latest days are used
+    (a rolling window), otherwise all earlier days are (an expanding
+    window). Returns (predictions, fit seconds, predict seconds) where
+    predictions[i] is the prediction for row start + i.
+"""
+
+def walkForward(predictor, data, start, refitEvery=20, end=None, trainWindow=None):
+    end = len(data['close']) if end is None else end
+    predictions = np.empty(end - start, dtype=np.float64)
+    fitSeconds = 0.0
+    predictSeconds = 0.0
+
+    for row in range(start, end):
+        first = max(0, row - trainWindow) if trainWindow else 0
+        history = {column: values[first:row] for column, values in data.items()}
+
+        startTime = time.perf_counter()
+        if (row - start) % refitEvery == 0:
+            predictor.fit(history)
+        else:
+            predictor.observe(history, 1)
+        fitSeconds += time.perf_counter() - startTime
+
+        startTime = time.perf_counter()
+        predictions[row - start] = predictor.predictNext()
+        predictSeconds += time.perf_counter() - startTime
+
+    return predictions, fitSeconds, predictSeconds
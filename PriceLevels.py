@@ -0,0 +1,148 @@
+from collections import OrderedDict
+import numpy as np
+
+"""
+    Daily price history rolled up into weekly and monthly bars, so a chart
+    over a long history only has to draw about as many candles as it has
+    room for. Every level is built once with a few vectorized reductions
+    and a live bar only rebuilds the last bar of each level. rollupDays
+    does the same for intraday bars into daily ones.
+
+    Bars of every level are dicts of arrays like the ones returned by
+    database_module.select_columns, dated with their first day.
+"""
+
+DAY_SECONDS = 24 * 60 * 60
+
+""" (level, days per bar) from the finest to the coarsest level """
+LEVELS = [('day', 1), ('week', 7), ('month', 30.44)]
+
+""" the period of each epoch second date at a level, as an integer """
+def periodKeys(dates, level):
+    days = np.asarray(dates, dtype=np.int64) // DAY_SECONDS
+    if level == 'day':
+        return days
+    if level == 'week':
+        # the epoch was a Thursday, shifting by 3 days starts weeks on Monday
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+""" rolls daily bars up into one bar per period of a level """
+def aggregate(prices, level):
+    if level == 'day':
+        return {column: np.array(values) for column, values in prices.items()}
+    return aggregateKeys(prices, periodKeys(prices['date'], level))
+
+""" rolls intraday bars up into daily bars dated UTC midnight, like the
+    prices table. Only regular session bars are stored, and the regular
+    session never crosses a UTC midnight, so the UTC day is the trading day """
+def rollupDays(bars):
+    days = aggregateKeys(bars, periodKeys(bars['date'], 'day'))
+    days['date'] = days['date'] - days['date'] % DAY_SECONDS
+    return days
+
+""" rolls bars up into one bar per run of equal keys, dated with the
+    period's first bar """
+def aggregateKeys(prices, keys):
+    if len(keys) == 0:
+        return {column: np.array(values) for column, values in prices.items()}
+
+    # the first row of every period, and the last
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+
+    bars = {'date': prices['date'][starts],
+            'open': prices['open'][starts],
+            'high': np.maximum.reduceat(prices['high'], starts),
+            'low': np.minimum.reduceat(prices['low'], starts),
+            'close': prices['close'][ends]}
+    if 'volume' in prices:
+        bars['volume'] = np.add.reduceat(prices['volume'], starts)
+    return bars
+
+class PriceLevels():
+
+    """ prices is a dict of daily arrays holding date (epoch seconds),
+        open, high, low, close and optionally volume, oldest first """
+    def __init__(self, prices):
+        self.levels = {level: aggregate(prices, level) for level, days in LEVELS}
+
+    """ returns the bars of a level """
+    def level(self, level):
+        return self.levels[level]
+
+    """ returns the finest level that shows the days from startTime to
+        endTime (epoch seconds) in at most maxBars bars. Bars are counted
+        in each level, so weekends and holidays do not count as days """
+    def pickLevel(self, startTime, endTime, maxBars):
+        for level, days in LEVELS:
+            dates = self.levels[level]['date']
+            bars = np.searchsorted(dates, endTime, side='right') - np.searchsorted(dates, startTime, side='left')
+            if bars <= maxBars:
+                return level
+        return LEVELS[-1][0]
+
+    """ version of the daily data the levels were built from """
+    def version(self):
+        dates = self.levels['day']['date']
+        return len(dates), int(dates[-1]) if len(dates) else None
+
+    """ takes a live daily bar, a dict with the same columns as the levels.
+        A bar with the same date as the last day replaces it, otherwise it
+        is a new day. The last bar of every coarser level is then rebuilt
+        from its days """
+    def update(self, bar):
+        daily = self.levels['day']
+        if len(daily['date']) and bar['date'] == daily['date'][-1]:
+            for column in daily:
+                daily[column][-1] = bar[column]
+        else:
+            for column in daily:
+                daily[column] = np.append(daily[column], bar[column])
+
+        # a month never has more than 31 days, so the last 32 rows hold the
+        # whole of the last period at every level
+        recent = {column: values[-32:] for column, values in daily.items()}
+
+        for level, days in LEVELS[1:]:
+            lastBar = {column: values[-1] for column, values in aggregate(recent, level).items()}
+            bars = self.levels[level]
+
+            if len(bars['date']) and periodKeys([lastBar['date']], level)[0] == periodKeys(bars['date'][-1:], level)[0]:
+                for column in bars:
+                    bars[column][-1] = lastBar[column]
+            else:
+                for column in bars:
+                    bars[column] = np.append(bars[column], lastBar[column])
+
+"""
+    Keeps the PriceLevels of the last maxEntries tickers. get() only
+    rebuilds the levels when the stored daily data changed and update()
+    moves a ticker's levels forward with a live bar.
+"""
+
+class PriceLevelCache():
+
+    def __init__(self, maxEntries=8):
+        self.entries = OrderedDict()
+        self.maxEntries = maxEntries
+
+    def get(self, ticker, prices):
+        ticker = str.upper(ticker)
+        dates = prices['date']
+        version = (len(dates), int(dates[-1]) if len(dates) else None)
+
+        priceLevels = self.entries.pop(ticker, None)
+        if priceLevels is None or priceLevels.version() != version:
+            priceLevels = PriceLevels(prices)
+
+        self.entries[ticker] = priceLevels
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+
+        return priceLevels
+
+    def update(self, ticker, bar):
+        priceLevels = self.entries.get(str.upper(ticker))
+        if priceLevels is not None:
+            priceLevels.update(bar)
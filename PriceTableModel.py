@@ -0,0 +1,104 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+import numpy as np
+
+""" Columns of the price table as (header, price array key) """
+TABLE_COLUMNS = [('Date', 'date'), ('Open', 'open'), ('High', 'high'),
+                 ('Low', 'low'), ('Close', 'close'), ('Volume', 'volume')]
+
+"""
+    Table model over the price arrays returned by
+    database_module.select_columns, newest day in the first row. The view
+    only asks for the cells it is drawing, so a ticker's whole history can
+    be shown and loading a new ticker is one model reset.
+"""
+
+class PriceTableModel(QAbstractTableModel):
+
+    def __init__(self, parent=None):
+        QAbstractTableModel.__init__(self, parent)
+        self.prices = None
+        self.dateText = None
+        self.count = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(TABLE_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return TABLE_COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+
+        if role != Qt.DisplayRole:
+            return None
+
+        # the rows are newest first, the arrays oldest first
+        row = self.count - 1 - index.row()
+        key = TABLE_COLUMNS[index.column()][1]
+
+        if key == 'date':
+            return self.dateText[row]
+        if key == 'volume':
+            return str(int(self.prices['volume'][row]))
+        return "$" + str(round(float(self.prices[key][row]), 2))
+
+    """ shows a new set of price arrays, holding date as epoch seconds and
+        the other columns of TABLE_COLUMNS """
+    def setPriceData(self, data):
+        self.beginResetModel()
+        # copied, since live bars are written into them
+        self.prices = {key: np.array(data[key]) for header, key in TABLE_COLUMNS}
+        self.dateText = self.formatDates(self.prices['date'])
+        self.count = len(self.prices['date'])
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.prices = None
+        self.dateText = None
+        self.count = 0
+        self.endResetModel()
+
+    """ 'YYYY-MM-DD' text of epoch second dates, all in one go """
+    def formatDates(self, dates):
+        return np.datetime_as_string(np.asarray(dates, dtype='datetime64[s]'), unit='D')
+
+    """ returns the price arrays, oldest first """
+    def priceData(self):
+        return self.prices
+
+    """ returns the newest day as a dict, or None when the table is empty """
+    def lastRow(self):
+        if self.count == 0:
+            return None
+        return {key: self.prices[key][-1] for header, key in TABLE_COLUMNS}
+
+    """ shows a live bar, a dict with the keys of TABLE_COLUMNS. A bar with
+        the same date as the newest day replaces it, otherwise it is added
+        as a new first row """
+    def updateLast(self, bar):
+        if self.count == 0:
+            self.setPriceData({key: [bar[key]] for header, key in TABLE_COLUMNS})
+            return
+
+        if bar['date'] == self.prices['date'][-1]:
+            for header, key in TABLE_COLUMNS:
+                self.prices[key][-1] = bar[key]
+            self.dataChanged.emit(self.index(0, 0), self.index(0, len(TABLE_COLUMNS) - 1))
+            return
+
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        for header, key in TABLE_COLUMNS:
+            self.prices[key] = np.append(self.prices[key], bar[key])
+        self.dateText = np.append(self.dateText, self.formatDates([bar['date']]))
+        self.count += 1
+        self.endInsertRows()
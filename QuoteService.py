@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+import numpy as np
+import database_module as db
+from YahooStockGrab import getQuotes, TICKER_LIST
+
+"""
+    Keeps the stored daily bars of a whole watchlist current while the
+    application runs. Every refresh asks yahoo for the latest quote of all
+    the stored tickers, a hundred tickers per request, writes whatever
+    changed in one transaction and returns the tickers that changed.
+
+    How long to wait between refreshes follows the US market hours
+
+        regular session      REGULAR_SECONDS
+        pre and post market  EXTENDED_SECONDS
+        closed               paused until the pre-market opens
+
+    The clock does not know about holidays, yahoo's market state does, so
+    a weekday the exchange is closed is polled every HOLIDAY_SECONDS.
+"""
+
+REGULAR_SECONDS = 30
+EXTENDED_SECONDS = 120
+HOLIDAY_SECONDS = 15 * 60
+
+DAY_SECONDS = 24 * 60 * 60
+
+# session boundaries as (hour, minute) New York time
+PRE_MARKET_OPEN = (4, 0)
+REGULAR_OPEN = (9, 30)
+REGULAR_CLOSE = (16, 0)
+POST_MARKET_CLOSE = (20, 0)
+
+""" hours New York is ahead of UTC at a naive UTC datetime. Daylight saving
+    runs from 2am on the second Sunday of March to 2am on the first Sunday
+    of November """
+def newYorkOffset(utcTime):
+    march = datetime(utcTime.year, 3, 8)
+    dstStart = march + timedelta(days=(6 - march.weekday()) % 7, hours=7)
+    november = datetime(utcTime.year, 11, 1)
+    dstEnd = november + timedelta(days=(6 - november.weekday()) % 7, hours=6)
+    return -4 if dstStart <= utcTime < dstEnd else -5
+
+def newYorkTime(utcTime):
+    return utcTime + timedelta(hours=newYorkOffset(utcTime))
+
+""" 'PRE', 'REGULAR', 'POST' or 'CLOSED' by the clock at a naive UTC
+    datetime, defaulting to now """
+def marketSession(utcTime=None):
+    local = newYorkTime(utcTime or datetime.utcnow())
+    if local.weekday() >= 5:
+        return 'CLOSED'
+
+    minute = (local.hour, local.minute)
+    if minute < PRE_MARKET_OPEN or minute >= POST_MARKET_CLOSE:
+        return 'CLOSED'
+    if minute < REGULAR_OPEN:
+        return 'PRE'
+    if minute < REGULAR_CLOSE:
+        return 'REGULAR'
+    return 'POST'
+
+""" seconds from a naive UTC datetime until the next weekday pre-market """
+def secondsUntilPreMarket(utcTime=None):
+    utcTime = utcTime or datetime.utcnow()
+    local = newYorkTime(utcTime)
+
+    opening = local.replace(hour=PRE_MARKET_OPEN[0], minute=PRE_MARKET_OPEN[1], second=0, microsecond=0)
+    if opening <= local:
+        opening += timedelta(days=1)
+    while opening.weekday() >= 5:
+        opening += timedelta(days=1)
+
+    # back to UTC with the offset in effect at the opening
+    utcOpening = opening + timedelta(hours=5)
+    utcOpening = opening - timedelta(hours=newYorkOffset(utcOpening))
+    return (utcOpening - utcTime).total_seconds()
+
+""" True for the tickers whose last stored date and quote date (epoch
+    seconds) have weekdays in between that are not stored """
+def missingDays(lastDates, quoteDates):
+    lastDays = (np.asarray(lastDates, dtype=np.int64) // DAY_SECONDS).astype('datetime64[D]')
+    quoteDays = (np.asarray(quoteDates, dtype=np.int64) // DAY_SECONDS).astype('datetime64[D]')
+    return np.busday_count(lastDays + 1, np.maximum(quoteDays, lastDays + 1)) > 0
+
+class QuoteService():
+
+    def __init__(self, tickers=TICKER_LIST):
+        self.tickers = [str.upper(ticker) for ticker in tickers]
+
+        # market states yahoo sent with the last quotes
+        self.marketStates = set()
+
+    """ fetches the latest quotes and stores them as the day's bars.
+        Tickers without any stored history are left to sync_ticker, and a
+        ticker that missed days since its last bar has those days written
+        along with its quote, in the same transaction, so no gap is left
+        behind. Returns the list of tickers whose stored bars changed """
+    def refresh(self, conn):
+        lastDates = db.select_last_dates(conn, self.tickers)
+        tickers = [ticker for ticker in self.tickers if ticker in lastDates]
+        if not tickers:
+            return []
+
+        quotes = {ticker: quote for ticker, quote in getQuotes(tickers).items() if ticker in lastDates}
+        self.marketStates = {quote['marketState'] for quote in quotes.values()}
+
+        quoted = list(quotes)
+        gaps = missingDays([lastDates[ticker] for ticker in quoted],
+                           [quotes[ticker]['date'] for ticker in quoted])
+        gapTickers = [ticker for ticker, gap in zip(quoted, gaps) if gap]
+
+        stockFrames = {}
+        if gapTickers:
+            stockFrames, errors = db.fetch_many(conn, gapTickers)
+            for ticker in errors:
+                quotes.pop(ticker, None)
+
+        changed = set(db.upsert_quotes(conn, quotes, stockFrames))
+        return [ticker for ticker in tickers if ticker in changed]
+
+    """ seconds to wait before the next refresh, best asked right after
+        one so yahoo's market states are current """
+    def nextInterval(self, utcTime=None):
+        session = marketSession(utcTime)
+
+        if session == 'CLOSED':
+            return secondsUntilPreMarket(utcTime)
+        if self.marketStates and self.marketStates.isdisjoint(('PRE', 'REGULAR', 'POST')):
+            return HOLIDAY_SECONDS
+        if session == 'REGULAR':
+            return REGULAR_SECONDS
+        return EXTENDED_SECONDS
@@ -0,0 +1,73 @@
+import builtins
+import sys
+import threading
+import time
+
+"""
+    Startup timing for the GUI entry point. install() wraps the import
+    statement until report() is called and times the first import of every
+    module on the main thread. Each import is charged to its top level
+    package, less the time spent importing other modules from inside it,
+    so the lines of the report add up to the total import time.
+"""
+
+startTime = time.perf_counter()
+
+# {top level package: seconds spent in its own imports}
+importTimes = {}
+
+# time taken by the imports below the one running, innermost last
+importStack = []
+
+originalImport = None
+
+def install():
+    global originalImport
+    if originalImport is None:
+        originalImport = builtins.__import__
+        builtins.__import__ = timedImport
+
+def uninstall():
+    global originalImport
+    if originalImport is not None:
+        builtins.__import__ = originalImport
+        originalImport = None
+
+""" True when an import statement would load a module that is not loaded
+    yet, including the submodules of a 'from package import module' """
+def loadsModule(name, fromlist):
+    if name not in sys.modules:
+        return True
+    return any(name + '.' + item not in sys.modules for item in fromlist or ()
+               if item != '*' and not hasattr(sys.modules[name], item))
+
+def timedImport(name, globals=None, locals=None, fromlist=(), level=0):
+    # relative imports are charged to the package doing them
+    if level != 0 or threading.current_thread() is not threading.main_thread() \
+            or not loadsModule(name, fromlist):
+        return originalImport(name, globals, locals, fromlist, level)
+
+    importStack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return originalImport(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        childTime = importStack.pop()
+        if importStack:
+            importStack[-1] += elapsed
+
+        package = name.partition('.')[0]
+        importTimes[package] = importTimes.get(package, 0.0) + elapsed - childTime
+
+""" stops timing imports and prints the slowest packages along with the
+    time since the application started """
+def report(count=12):
+    uninstall()
+    elapsed = time.perf_counter() - startTime
+
+    print("Startup took {:.0f} ms, imports by package:".format(elapsed * 1000))
+    slowest = sorted(importTimes.items(), key=lambda item: item[1], reverse=True)
+    for package, seconds in slowest[:count]:
+        print("    {:<20}{:>8.1f} ms".format(package, seconds * 1000))
+    print("    {:<20}{:>8.1f} ms".format("all imports", sum(importTimes.values()) * 1000))
@@ -1,15 +1,19 @@
 print("Loading Application...")
+# time every import from here on, reported once the window is up
+import StartupTimer
+StartupTimer.install()
 from PyQt5.QtWidgets import QMainWindow
 from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QComboBox
-from PyQt5.QtWidgets import QPushButton, QTableWidget, QScrollArea
+from PyQt5.QtWidgets import QPushButton, QTableView, QScrollArea
+from PyQt5.QtWidgets import QHeaderView, QAbstractItemView
 from PyQt5.QtWidgets import QGridLayout, QVBoxLayout, QHBoxLayout
 from PyQt5.QtWidgets import QGraphicsView, QMessageBox
 from PyQt5.QtChart import *
-from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtGui import QColor, QPainter, QPen
 import sys
-import time
-from datetime import date, datetime
 from GuiController import GuiCtrl
+from PriceTableModel import PriceTableModel
+from YahooStockGrab import TICKER_LIST
 from PyQt5 import QtCore
 import numpy as np
 
@@ -132,6 +136,24 @@ class StockGui(QMainWindow):
         # hide the legend
         self.candleChart.legend().setVisible(False)
 
+        # the series holding one candle per day, it is filled from the
+        # price arrays in updateChartSeries
+        self.candleChartSeries = QCandlestickSeries()
+        self.candleChartSeries.setMinimumColumnWidth(4)
+        self.candleChartSeries.setIncreasingColor(QColor(0, 255, 0, 255)) #RGB+Alpha
+        self.candleChartSeries.setDecreasingColor(QColor(255, 0, 0, 255))
+        self.candleChart.addSeries(self.candleChartSeries)
+
+        # dates along the bottom, prices up the side
+        self.axisX = QDateTimeAxis()
+        self.axisX.setFormat("yyyy-MM-dd")
+        self.axisX.setGridLineVisible(False)
+        self.axisY = QValueAxis()
+        self.candleChart.addAxis(self.axisX, QtCore.Qt.AlignBottom)
+        self.candleChart.addAxis(self.axisY, QtCore.Qt.AlignLeft)
+        self.candleChartSeries.attachAxis(self.axisX)
+        self.candleChartSeries.attachAxis(self.axisY)
+
         # add the chart into a view
         self.chartView = QChartView(self.candleChart)
         self.chartView.setRenderHint(QPainter.Antialiasing)
@@ -149,74 +171,196 @@ class StockGui(QMainWindow):
         self.chartView.mouseReleaseEvent = self.chartMouseReleaseEventHandler
     
         self.chartWidgetLayout.addWidget(self.chartView)
+
+        # how many of the newest days the chart starts out showing
+        self.chartDays = 254
+
+        # the daily, weekly and monthly bars of the shown ticker, which of
+        # them is drawn and the rows of it that are in the candle series
+        self.priceLevels = None
+        self.chartLevel = None
+        self.loadedFirst = 0
+        self.loadedLast = 0
+        self.loadedRows = 0
+        # a year of daily candles fits the plot area at this spacing
+        self.pixelsPerCandle = 2
+
+        # indicator lines drawn over the candles, by indicator output name
+        self.overlaySeries = {}
+        self.overlayColors = [QColor(0, 0, 255, 255), QColor(255, 128, 0, 255),
+                              QColor(128, 0, 128, 255), QColor(128, 0, 128, 128),
+                              QColor(128, 0, 128, 128)]
                     
         self.leftMainLayout.addWidget(self.chartWidget)
 
-    def updateChartSeries(self):
-
-        # remove all current series
-        self.candleChart.removeAllSeries()
-
-        # create a new series of data that will hold the stock data
-        self.candleChartSeries = QCandlestickSeries()
-        self.candleChartSeries.setMinimumColumnWidth(4)
-        self.candleChartSeries.setIncreasingColor(QColor(0, 255, 0, 255)) #RGB+Alpha
-        self.candleChartSeries.setDecreasingColor(QColor(255, 0, 0, 255))
-
-        # create the set structure that holds one OHLCV day of data
-
-        for x in range(len(self.cellList)-6, 6, -6):
-            self.candleChartSet = QCandlestickSet()
-            # Date as timestamp
-            # only add the row of data if it is not blank
-            if not(self.cellList[x].text() == ""):
-                self.candleChartSet.setTimestamp(float(time.mktime(datetime.strptime(self.cellList[x].text(), " %Y-%m-%d ").timetuple())))
-                self.candleChartSet.setOpen(float(self.cellList[x+1].text()[1:])) # Open
-                self.candleChartSet.setHigh(float(self.cellList[x+2].text()[1:])) # High
-                self.candleChartSet.setLow(float(self.cellList[x+3].text()[1:])) # Low
-                self.candleChartSet.setClose(float(self.cellList[x+4].text()[1:])) # Close
-
-                #ohlcList.append(self.cellList[x+5]) # Volume 
-
-                self.candleChartSeries.append(self.candleChartSet)
-        
-        self.candleChart.addSeries(self.candleChartSeries)
-        #self.candleChart.setAnimationOptions(QChart.SeriesAnimations)
-
-        # create default axes for chart
-        self.candleChart.createDefaultAxes()
-
-        self.candleChart.axes()[0].setGridLineVisible(False)
-
-        self.candleChart.update()
-
-        """# set the x axis as date (DOES NOT WORK YET)
-
-        self.axisX = QDateTimeAxis()
-        
-        dateEnd = QtCore.QDate()
-        dateEnd.setDate(int(self.cellList[6].text()[1:5]), # year
-                          int(self.cellList[6].text()[6:8]), # month
-                          int(self.cellList[6].text()[9:11])) # day
-
-        axisEnd = QtCore.QDateTime()
-        axisEnd.setDate(dateEnd)
-
-        dateBegin = QtCore.QDate()
-        dateBegin.setDate(int(self.cellList[len(self.cellList)-6].text()[1:5]),
-                        int(self.cellList[len(self.cellList)-6].text()[6:8]),
-                        int(self.cellList[len(self.cellList)-6].text()[9:11]))
-        
-        axisBegin = QtCore.QDateTime()
-        axisBegin.setDate(dateBegin)
-        
-        self.axisX.setRange(axisBegin, axisEnd)
-        self.axisX.setFormat("yyyy-MM-dd")
-
-        self.candleChart.setAxisX(self.axisX, self.candleChartSeries) """
-
+    """ milliseconds since the epoch, the time unit of QDateTimeAxis, for
+        epoch second dates. Daily candles are placed at noon UTC so the
+        axis shows the right day in any local time zone """
+    def chartTimes(self, dates):
+        return (np.asarray(dates, dtype=np.int64) + 12 * 60 * 60) * 1000
+
+    """ fills the chart from a PriceLevels of the ticker's daily, weekly and
+        monthly bars """
+    def updateChartSeries(self, priceLevels):
+
+        self.priceLevels = priceLevels
+        self.chartLevel = None
+
+        # remove the old candles and indicator lines
+        self.candleChartSeries.clear()
+        for series in self.overlaySeries.values():
+            self.candleChart.removeSeries(series)
+        self.overlaySeries = {}
+
+        dailyTimes = self.chartTimes(priceLevels.level('day')['date'])
+        if len(dailyTimes) == 0:
+            return
+
+        # start out showing the last chartDays days
+        first = max(0, len(dailyTimes) - self.chartDays)
+        self.setChartRange(dailyTimes[first], dailyTimes[-1])
+
+    """ shows the candles from startTime to endTime (ms since the epoch) """
+    def setChartRange(self, startTime, endTime):
+        halfDay = 12 * 60 * 60 * 1000
+        self.axisX.setRange(QtCore.QDateTime.fromMSecsSinceEpoch(int(startTime - halfDay)),
+                            QtCore.QDateTime.fromMSecsSinceEpoch(int(endTime + halfDay)))
+        self.refreshChartLevel(fitPrices=True)
+
+    """ picks daily, weekly or monthly candles for the visible dates so the
+        chart draws about one candle per pixelsPerCandle pixels, and fits the
+        price axis to them when fitPrices is set or other candles were
+        loaded. Called whenever the chart is zoomed or panned """
+    def refreshChartLevel(self, fitPrices=False):
+        if self.priceLevels is None:
+            return
+
+        startTime = self.axisX.min().toMSecsSinceEpoch()
+        endTime = self.axisX.max().toMSecsSinceEpoch()
+        # before the first layout the plot area has no size yet
+        width = self.candleChart.plotArea().width() or self.chartView.width()
+        maxCandles = max(int(width / self.pixelsPerCandle), 1)
+
+        level = self.priceLevels.pickLevel(startTime / 1000, endTime / 1000, maxCandles)
+        prices = self.priceLevels.level(level)
+        times = self.chartTimes(prices['date'])
+
+        first = int(np.searchsorted(times, startTime, side='left'))
+        last = int(np.searchsorted(times, endTime, side='right'))
+
+        # only the visible candles and a screen's worth either side are in
+        # the series, so short pans do not have to load anything
+        if level != self.chartLevel or first < self.loadedFirst or last > self.loadedLast:
+            span = max(last - first, 1)
+            self.loadCandles(level, max(0, first - span), min(len(times), last + span))
+            fitPrices = True
+
+        # the indicator periods are in days, so they are only drawn over days
+        for series in self.overlaySeries.values():
+            series.setVisible(level == 'day')
+
+        if fitPrices and first < last:
+            low = float(np.min(prices['low'][first:last]))
+            high = float(np.max(prices['high'][first:last]))
+            padding = (high - low) * .05 or 1
+            self.axisY.setRange(low - padding, high + padding)
+
+    """ puts the bars first to last of a level into the candle series """
+    def loadCandles(self, level, first, last):
+        prices = self.priceLevels.level(level)
+        times = self.chartTimes(prices['date'][first:last])
+
+        # build every candle first and add them in one call, so the chart
+        # only lays itself out once
+        candles = [QCandlestickSet(openPrice, high, low, close, timestamp) for openPrice, high, low, close, timestamp in
+                   zip(prices['open'][first:last].tolist(), prices['high'][first:last].tolist(),
+                       prices['low'][first:last].tolist(), prices['close'][first:last].tolist(),
+                       times.tolist())]
+
+        self.candleChartSeries.clear()
+        self.candleChartSeries.append(candles)
+
+        self.chartLevel = level
+        self.loadedFirst = first
+        self.loadedLast = last
+        self.loadedRows = len(prices['date'])
+
+    """ redraws the newest candle after priceLevels took a live bar. The
+        candle is changed in place when it is still the same period,
+        otherwise a new candle is added after it """
+    def updateLastCandle(self):
+        if self.priceLevels is None or self.chartLevel is None:
+            return
+
+        halfDay = 12 * 60 * 60 * 1000
+        prices = self.priceLevels.level(self.chartLevel)
+        timestamp = int(self.chartTimes(prices['date'][-1:])[0])
+
+        candles = self.candleChartSeries.sets()
+        lastVisible = len(candles) == 0 or self.axisX.max().toMSecsSinceEpoch() >= candles[-1].timestamp()
+
+        # nothing to draw when the newest candles are not loaded
+        if self.loadedLast < self.loadedRows:
+            return
+
+        if candles and candles[-1].timestamp() == timestamp:
+            # the set is changed in place, the chart redraws just that
+            # candle and the zoom, pan and price axis are left alone
+            candles[-1].setOpen(float(prices['open'][-1]))
+            candles[-1].setHigh(float(prices['high'][-1]))
+            candles[-1].setLow(float(prices['low'][-1]))
+            candles[-1].setClose(float(prices['close'][-1]))
+            return
+
+        self.candleChartSeries.append(QCandlestickSet(float(prices['open'][-1]), float(prices['high'][-1]),
+                                                      float(prices['low'][-1]), float(prices['close'][-1]),
+                                                      timestamp))
+        self.loadedLast = self.loadedRows = len(prices['date'])
+
+        # a new candle only moves the view when the newest one was in it,
+        # and then just far enough to show it. The level is picked again
+        # since the visible range grew
+        if lastVisible and self.axisX.max().toMSecsSinceEpoch() < timestamp + halfDay:
+            self.axisX.setMax(QtCore.QDateTime.fromMSecsSinceEpoch(timestamp + halfDay))
+            self.refreshChartLevel()
+
+    """ draws indicator lines over the candles. overlays is a dict of
+        {name: values} with one value per day in dates (epoch seconds) """
+    def updateOverlaySeries(self, dates, overlays):
+
+        times = self.chartTimes(dates)
+
+        for index, (name, values) in enumerate(overlays.items()):
+            valid = ~np.isnan(values)
+
+            series = QLineSeries()
+            series.setName(name)
+            series.setPen(QPen(self.overlayColors[index % len(self.overlayColors)], 1))
+            series.append([QtCore.QPointF(x, y) for x, y in zip(times[valid].tolist(), values[valid].tolist())])
+
+            self.candleChart.addSeries(series)
+            series.attachAxis(self.axisX)
+            series.attachAxis(self.axisY)
+            # the indicator periods are in days, so they are only drawn over days
+            series.setVisible(self.chartLevel == 'day')
+            self.overlaySeries[name] = series
+
+    """ moves each indicator line to its value on date (epoch seconds),
+        adding a point when date is after the line's last one """
+    def updateOverlayLast(self, date, values):
+        timestamp = float(self.chartTimes([date])[0])
+
+        for name, value in values.items():
+            series = self.overlaySeries.get(name)
+            if series is None or np.isnan(value):
+                continue
+
+            last = series.count() - 1
+            if last >= 0 and series.at(last).x() == timestamp:
+                series.replace(last, QtCore.QPointF(timestamp, value))
+            else:
+                series.append(timestamp, value)
 
-        
     """ Controls how pressing the mouse button down and moving the
         mouse makes the chart move """
     def chartMousePressEventHandler(self, e):
@@ -262,6 +406,9 @@ class StockGui(QMainWindow):
             self.mousePrevXPos = newMouseXPos
             self.mousePrevYPos = newMouseYPos
 
+            # pick the candles for the new visible dates
+            self.refreshChartLevel()
+
 
     """ Controls how the mouse wheel effects chart zoom """
     def chartMouseWheelEventHandler(self, e):
@@ -271,6 +418,10 @@ class StockGui(QMainWindow):
         elif e.angleDelta().y() < 0:
             # negative number means zoom out
             self.candleChart.zoom((e.angleDelta().y() / 120) + 1.9)
+
+        # zooming out can switch to weekly or monthly candles and zooming
+        # in back to daily ones
+        self.refreshChartLevel()
                     
     def createNewsWidget(self):
 
@@ -365,28 +516,7 @@ class StockGui(QMainWindow):
         self.tickerComboBox = QComboBox()
         
         # list of tickers that the program will support
-        # list was taken from url
-        # https://finviz.com/screener.ashx?v=211&f=cap_large,sec_technology
-        # last updated: Nov 3, 2020
-
-        tickerList = ['ACN', 'ADI', 'ADSK', 'AKAM', 'AMAT', 'AMD', 'ANET',
-                      'ANSS', 'APH', 'ASML', 'AVGO', 'AVLR', 'BKI', 'BR',
-                      'CAJ', 'CCC', 'CDAY', 'CDNS', 'CDW', 'CGNX', 'CHKP',
-                      'COUP', 'CRWD', 'CSCO', 'CTSH', 'CTXS', 'DDOG', 'DELL',
-                      'DNB', 'DOCU', 'DT', 'ENPH', 'EPAM', 'ERIC', 'FICO',
-                      'FIS', 'FISV', 'FLT', 'FTNT', 'FIV', 'GDDY', 'GDS',
-                      'GIB', 'GLW', 'GRMN', 'HPE', 'HPQ', 'HUBS', 'IBM',
-                      'INFY', 'INTC', 'INTU', 'IPGP', 'IT', 'JKHY', 'KEYS',
-                      'KLAC', 'LDOS', 'LOGI', 'LRCX', 'MCHP', 'MDB', 'MPWR',
-                      'MRVL', 'MSI', 'MU', 'MXIM', 'NET', 'NICE', 'NLOK',
-                      'NOK', 'NOW', 'NTAP', 'NXPI', 'OKTA', 'ON', 'ORCL',
-                      'OTEX', 'PAGS', 'PANW', 'PAYC', 'PCTY', 'PLTR', 'PTC',
-                      'QCOM', 'QRVO', 'RNG', 'SAP', 'SEDG', 'SHOP', 'SNE',
-                      'SNOW', 'SNPS', 'SPLK', 'SQ', 'SSNC', 'STM', 'STNE',
-                      'STX', 'SWKS', 'TDY', 'TEAM', 'TEL', 'TER', 'TRMB',
-                      'TTD', 'TXN', 'TYL', 'U', 'UBER', 'UI', 'UMC', 'VMW',
-                      'VRSN', 'WDAY', 'WDC', 'WIT', 'WIX', 'WORK', 'XLNX',
-                      'ZBRA', 'ZEN', 'ZI', 'ZS']
+        tickerList = TICKER_LIST
                                 
         self.tickerComboBox.addItems(tickerList)
         self.tickerComboBox.setEditable(True)
@@ -435,115 +565,33 @@ class StockGui(QMainWindow):
 
     def createPriceTableWidget(self):
 
-        # we are using labels to represent the price tables
-        # since it is easier than trying to use a custom QTableView
-
-        self.numberOfRows = 255
-        
-        self.numberOfCells = self.numberOfRows * 6 # 6 for the number of columns
-        
-        self.priceTableWidget = QWidget()
-        self.priceTableWidget.setFixedSize(415, 9000)
-        self.priceTableWidgetLayout = QGridLayout()
-        self.priceTableWidgetLayout.setContentsMargins(0, 0, 0, 0)
-        self.priceTableWidgetLayout.setHorizontalSpacing(0)
-        self.priceTableWidgetLayout.setVerticalSpacing(0)
-        self.priceTableWidget.setLayout(self.priceTableWidgetLayout)
-
-        # scroll widget for making the widget container scollable
-        self.priceScrollBar = QScrollArea()
-
-        self.priceScrollBar.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.priceScrollBar.setStyleSheet("border: none;\
-                                      background-color: rgba(255,255,255,0);")
-        self.priceScrollBar.setWidget(self.priceTableWidget)
+        # the table view only draws the rows that are on screen and reads
+        # them straight from the model's price arrays
+        self.priceTableModel = PriceTableModel()
 
-        # set minimum row height for all of the rows
+        self.priceTableView = QTableView()
+        self.priceTableView.setModel(self.priceTableModel)
+        self.priceTableView.setSelectionMode(QAbstractItemView.NoSelection)
+        self.priceTableView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.priceTableView.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.priceTableView.verticalHeader().setVisible(False)
 
-        for x in range(0, self.numberOfRows):
-            self.priceTableWidgetLayout.setRowMinimumHeight(x, 500)
+        # fixed row heights so the view never has to measure the rows
+        self.priceTableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.priceTableView.verticalHeader().setDefaultSectionSize(30)
+        self.priceTableView.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
+        self.priceTableView.setStyleSheet("QTableView {font-size: 14px;\
+                                                       border: none;\
+                                                       gridline-color: black;\
+                                                       background-color: rgba(255,255,255,0);}\
+                                           QHeaderView::section {font-size: 16px;\
+                                                                 font-weight: bold;\
+                                                                 border: none;\
+                                                                 border-bottom: 3px solid black;\
+                                                                 background-color: rgba(255,255,255,0);}")
 
-        
-        self.cellList = []
-
-        # create cells
-        for x in range(0, self.numberOfCells):
-            self.cellList.append(QLabel())
-            self.cellList[x].setAlignment(QtCore.Qt.AlignCenter)
-
-        # set values and styles for header cells
-        # this should be the first 6 cells in the list
-        for x in range(0, 6):
-            if x == 0:
-                self.cellList[x].setText("Date")
-            elif x == 1:
-                self.cellList[x].setText("Open")
-            elif x == 2:
-                self.cellList[x].setText("High")
-            elif x == 3:
-                self.cellList[x].setText("Low")
-            elif x == 4:
-                self.cellList[x].setText("Close")
-            elif x == 5:
-                self.cellList[x].setText("Volume")
-            else:
-                print("ERROR SETTING PRICE TABLE HEADERS")
-
-            self.cellList[x].setStyleSheet("font-size: 16px;\
-                                            border-left: 3px solid black;\
-                                            border-bottom: 3px solid black;\
-                                            border-top: 3px solid black;\
-                                            font-weight: bold;")
-
-        # add text to the rest of the cells for testing purposes
-        cellCount = 0 # used to figure out what cell we are on
-        for x in range(6, self.numberOfCells):
-            if not cellCount == 6:
-                if cellCount == 0:
-                    # date cell
-                    self.cellList[x].setText("")
-                    cellCount += 1
-                elif cellCount == 1:
-                    # open cell
-                    self.cellList[x].setText("")
-                    cellCount += 1
-                elif cellCount == 2:
-                    # high cell
-                    self.cellList[x].setText("")
-                    cellCount += 1
-                elif cellCount == 3:
-                    # low cell
-                    self.cellList[x].setText("")
-                    cellCount += 1
-                elif cellCount == 4:
-                    # close cell
-                    self.cellList[x].setText("")
-                    cellCount += 1
-                elif cellCount == 5:
-                    self.cellList[x].setText("")
-                    cellCount = 0
-
-        # set the style for the rest of the cells
-
-        for x in range(6, self.numberOfCells):
-            self.cellList[x].setStyleSheet("font-size: 14px;\
-                                             border-left: 3px solid black;\
-                                             border-bottom: 3px solid black;")
-        # add the cells to the grid layout
-        rowNumber = 0
-        columnNumber = 0
-        for x in range(0, self.numberOfCells):
-            self.priceTableWidgetLayout.addWidget(self.cellList[x], rowNumber, columnNumber)
-            if not columnNumber == 5:
-                columnNumber += 1
-            else:
-                columnNumber = 0
-                # go to the next row once all the columns have cells
-                rowNumber += 1
-        
-            
-        self.rightMainLayout.addWidget(self.priceScrollBar)
+        self.rightMainLayout.addWidget(self.priceTableView)
 
 
 def main():
@@ -557,6 +605,7 @@ def main():
     stockProgram.aboutToQuit.connect(guiCtrl.stopThreads)
     # show the gui through the controller
     guiCtrl.display()
+    QtCore.QTimer.singleShot(0, StartupTimer.report)
 
     # execute Stock Program Application    
     sys.exit(stockProgram.exec())
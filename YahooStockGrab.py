@@ -1,14 +1,108 @@
 import requests
-import bs4
-import json
-import pandas as pd
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import numpy as np
+from datetime import datetime
+
+# list of tickers that the program will support
+# list was taken from url
+# https://finviz.com/screener.ashx?v=211&f=cap_large,sec_technology
+# last updated: Nov 3, 2020
+
+TICKER_LIST = ['ACN', 'ADI', 'ADSK', 'AKAM', 'AMAT', 'AMD', 'ANET',
+               'ANSS', 'APH', 'ASML', 'AVGO', 'AVLR', 'BKI', 'BR',
+               'CAJ', 'CCC', 'CDAY', 'CDNS', 'CDW', 'CGNX', 'CHKP',
+               'COUP', 'CRWD', 'CSCO', 'CTSH', 'CTXS', 'DDOG', 'DELL',
+               'DNB', 'DOCU', 'DT', 'ENPH', 'EPAM', 'ERIC', 'FICO',
+               'FIS', 'FISV', 'FLT', 'FTNT', 'FIV', 'GDDY', 'GDS',
+               'GIB', 'GLW', 'GRMN', 'HPE', 'HPQ', 'HUBS', 'IBM',
+               'INFY', 'INTC', 'INTU', 'IPGP', 'IT', 'JKHY', 'KEYS',
+               'KLAC', 'LDOS', 'LOGI', 'LRCX', 'MCHP', 'MDB', 'MPWR',
+               'MRVL', 'MSI', 'MU', 'MXIM', 'NET', 'NICE', 'NLOK',
+               'NOK', 'NOW', 'NTAP', 'NXPI', 'OKTA', 'ON', 'ORCL',
+               'OTEX', 'PAGS', 'PANW', 'PAYC', 'PCTY', 'PLTR', 'PTC',
+               'QCOM', 'QRVO', 'RNG', 'SAP', 'SEDG', 'SHOP', 'SNE',
+               'SNOW', 'SNPS', 'SPLK', 'SQ', 'SSNC', 'STM', 'STNE',
+               'STX', 'SWKS', 'TDY', 'TEAM', 'TEL', 'TER', 'TRMB',
+               'TTD', 'TXN', 'TYL', 'U', 'UBER', 'UI', 'UMC', 'VMW',
+               'VRSN', 'WDAY', 'WDC', 'WIT', 'WIX', 'WORK', 'XLNX',
+               'ZBRA', 'ZEN', 'ZI', 'ZS']
+
+YAHOO_CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/'
+
+YAHOO_QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+
+HEADERS = {"User-Agent":"Mozilla/5.0"}
+
+"""
+    One keep-alive session shared by every request in the program so
+    repeated calls reuse the same TCP/TLS connections. Failed requests
+    and rate limit responses are retried with exponential backoff.
+"""
+
+session = None
+sessionLock = threading.Lock()
+
+def getSession():
+    global session
+
+    with sessionLock:
+        if session is None:
+            retries = Retry(total=3, backoff_factor=.5,
+                            status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+    return session
+
+"""
+    Spaces out requests to each host so that no host sees more than
+    requestsPerSecond requests, no matter how many threads are fetching.
+"""
+
+class RateLimiter():
+
+    def __init__(self, requestsPerSecond):
+        self.interval = 1.0 / requestsPerSecond if requestsPerSecond else 0
+        self.nextSlot = {}
+        self.lock = threading.Lock()
+
+    """ blocks until the next request to the url's host is allowed """
+    def wait(self, url):
+        host = urlparse(url).netloc
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.nextSlot.get(host, now))
+            self.nextSlot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+"""
+    Intervals below a day that yahoo serves, as {interval: (days per
+    request, days of history)}. Older intraday bars are not available.
+"""
+
+INTRADAY_INTERVALS = {'1m': (7, 29), '5m': (59, 59), '15m': (59, 59), '1h': (729, 729)}
+
+def chartUrl(ticker, startTime, endTime, interval, baseUrl=YAHOO_CHART_URL):
+    return baseUrl + ticker + '?symbol=' + ticker + '&period1=' + \
+    str(int(startTime)) + '&period2=' + str(int(endTime)) + '&interval=' + interval
 
 """
     Grabs daily or weekly price data from finance.yahoo.com
 """
 
-def getYahooData(ticker, startDate, endDate, interval):
+def getYahooData(ticker, startDate, endDate, interval, baseUrl=YAHOO_CHART_URL, rateLimiter=None):
 
     
     # have to convert each date to unix for the yahoo url
@@ -17,145 +111,243 @@ def getYahooData(ticker, startDate, endDate, interval):
     startDateUnix = int(datetime.strptime(startDate, '%d-%m-%Y').timestamp())
     endDateUnix = int(datetime.strptime(endDate, '%d-%m-%Y').timestamp())
     
-    url = 'https://query1.finance.yahoo.com/v8/finance/chart/' + ticker + '?symbol=' + ticker + '&period1=' + \
-    str(startDateUnix) + '&period2=' + str(endDateUnix) + '&interval=' + interval
-    
-    res = requests.get(url, headers={"User-Agent":"Mozilla/5.0"})
+    url = chartUrl(ticker, startDateUnix, endDateUnix, interval, baseUrl)
 
-    soup = bs4.BeautifulSoup(res.text, 'html.parser')
-    
-    # sort through the nested dictionary mess and put each value in its own list
+    if rateLimiter is not None:
+        rateLimiter.wait(url)
     
-    newDictionary=json.loads(str(soup))
-    try:
-        newDictionary2 = newDictionary['chart']['result'][0]
-    
-        unixDates = newDictionary2['timestamp']
-        
-        dates = []
-        
-        # turn the unix timestamps back into dates
-        for item in unixDates:
-            dateFormat = datetime.fromtimestamp(item).date().strftime('%Y-%m-%d')
-            dates.append(dateFormat)
-        
-        newDictionary3 = newDictionary2['indicators']['quote'][0]
-        
-        # convert each value into float so that we can only keep two places after the decimal
-        
-        strOpens = newDictionary3['open']
-        
-        opens = []
-        
-        for item in strOpens:
-            if item == None:
-                number = 0.00
-                opens.append(number)
-            else:
-                number = format(round(float(item), 2), '.2f')
-                opens.append(number)
-            
-            
-        strHighs = newDictionary3['high']
-        
-        highs = []
-        
-        for item in strHighs:
-            if item == None:
-                number = 0
-                highs.append(number)
-            else:
-                number = format(round(float(item), 2), '.2f')
-                highs.append(number)
-            
-        strLows = newDictionary3['low']
-        
-        lows = []
-        
-        for item in strLows:
-            if item == None:
-                number = 0
-                lows.append(number)
-            else:
-                number = format(round(float(item), 2), '.2f')
-                lows.append(number)
-            
-        strCloses = newDictionary3['close']
-        
-        closes = []
-        
-        for item in strCloses:
-            if item == None:
-                number = 0
-                closes.append(number)
-            else:
-                number = format(round(float(item), 2), '.2f')
-                closes.append(number)
-            
-        strVolumes = newDictionary3['volume']
-
-        volumes = []
-        
-        for item in strVolumes:
-            if item == None:
-                number = 0
-                volumes.append(number)
-            else:
-                number = int(item)
-                volumes.append(number)
-                
+    res = getSession().get(url, timeout=30)
 
-        
-        newDictionary4 = newDictionary2['indicators']['adjclose'][0]
-        
-        strAdjCloses = newDictionary4['adjclose']
-        
-        adjCloses = []
-        
-        for item in strAdjCloses:
-            if item == None:
-                 number = 0
-            else:
-                 number = round(float(item), 2)
-                 adjCloses.append(number)
-            
-        # append them all to their own list so that each entry in the list is a full OHLC entry for the day
-        
-        newList = []
-        finalList = []
-        
-        for i in range(0, len(dates)):
-            newList.append(dates[i])
-            newList.append(opens[i])
-            newList.append(highs[i])
-            newList.append(lows[i])
-           # newList.append(closes[i])
-            newList.append(adjCloses[i])
-            newList.append(volumes[i])
-            finalList.append(newList)
-            newList = []
-
-            #uncomment for a full return of all data. This was changed because mplfinance does not consider
-            #displaying the Adj. close column so the 'Close' column of the return is the actual 'Adj. Close'
-            #stockDf = pd.DataFrame(finalList, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Adj. Close', 'Volume'])
-
-            stockDf = pd.DataFrame(finalList, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
-            
-        return stockDf
-    except:
-        error = newDictionary['chart']['error']['description']
-        #print(error)
+    # the response is plain json so it is decoded once, straight from the bytes
+    return parseYahooChart(res.json())
+
+"""
+    Grabs the bars of any interval, intraday ones included, between two
+    epoch second times. See parseYahooBars for what comes back.
+"""
+
+def getYahooBars(ticker, startTime, endTime, interval, baseUrl=YAHOO_CHART_URL, rateLimiter=None):
+
+    url = chartUrl(ticker, startTime, endTime, interval, baseUrl)
+
+    if rateLimiter is not None:
+        rateLimiter.wait(url)
+
+    res = getSession().get(url, timeout=30)
+
+    return parseYahooBars(res.json())
+
+""" returns the first result of a decoded yahoo chart response, raising
+    yahoo's error when there is none """
+def chartResult(chartData):
+
+    chart = chartData['chart']
+
+    if chart.get('error') or not chart.get('result'):
+        error = chart.get('error') or {}
+        raise ValueError(error.get('description', 'No data returned'))
+
+    return chart['result'][0]
+
+""" the columns of a chart result as numpy arrays, date holding the epoch
+    second timestamps yahoo sent. Bars yahoo sends without a close (days
+    or minutes nothing traded, or not filled in yet) are left out, so no
+    NaN close ever reaches the database. A range nothing traded in comes
+    back without timestamps and with empty quotes, which gives empty
+    arrays """
+def chartColumns(result):
+
+    timestamps = np.asarray(result.get('timestamp') or [], dtype=np.int64)
+    indicators = result.get('indicators', {})
+    quote = (indicators.get('quote') or [{}])[0]
+
+    # a column yahoo left out is all missing
+    missing = [None] * len(timestamps)
+
+    # None values become NaN when the list is converted to float64
+    def toPrices(values):
+        return np.round(np.array(values, dtype=np.float64), 2)
+
+    # the 'Close' column is the adjusted close when yahoo provides one
+    # (daily and longer intervals). mplfinance does not consider the
+    # Adj. Close column so this is what gets charted and stored
+    adjClose = (indicators.get('adjclose') or [{}])[0].get('adjclose')
+    closes = adjClose if adjClose else quote.get('close', missing)
+
+    volumes = np.array(quote.get('volume', missing), dtype=np.float64)
+    volumes = np.nan_to_num(volumes).astype(np.int64)
+
+    closes = toPrices(closes)
+    traded = ~np.isnan(closes)
+
+    return {'date': timestamps[traded],
+            'open': toPrices(quote.get('open', missing))[traded],
+            'high': toPrices(quote.get('high', missing))[traded],
+            'low': toPrices(quote.get('low', missing))[traded],
+            'close': closes[traded],
+            'volume': volumes[traded]}
+
+"""
+    Turns a decoded yahoo chart response into a dataframe with the columns
+    Date, Open, High, Low, Close, Volume. Each column is built in one numpy
+    step so the cost stays linear in the number of bars. Bars without a
+    close are dropped, other missing prices come back as NaN and missing
+    volumes as 0.
+"""
+
+def parseYahooChart(chartData):
+
+    result = chartResult(chartData)
+    bars = chartColumns(result)
+
+    # pandas is only needed once a chart is downloaded, not at startup
+    import pandas as pd
+
+    # shift the timestamps into the exchange's time zone before taking the date
+    gmtOffset = result.get('meta', {}).get('gmtoffset', 0)
+    dates = pd.to_datetime(bars['date'] + gmtOffset, unit='s').strftime('%Y-%m-%d')
+
+    stockDf = pd.DataFrame({'Date': dates,
+                            'Open': bars['open'],
+                            'High': bars['high'],
+                            'Low': bars['low'],
+                            'Close': bars['close'],
+                            'Volume': bars['volume']},
+                           columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+    return stockDf
+
+"""
+    Turns a decoded yahoo chart response into a dict of numpy arrays like
+    the ones database_module.select_columns returns, date being the epoch
+    second (UTC) start of each bar. Intraday charts have empty bars for the
+    minutes nothing traded, those are left out.
+"""
+
+def parseYahooBars(chartData):
+
+    return chartColumns(chartResult(chartData))
+
+"""
+    Grabs price data for many tickers at once using a bounded pool of
+    threads over the shared session. startDate can be a single
+    'DD-MM-YYYY' string or a dict of {ticker: startDate} so each ticker
+    only downloads what it is missing. Returns a tuple of
+    ({ticker: dataframe}, {ticker: error message}).
+"""
+
+def getManyYahooData(tickers, startDate, endDate, interval, maxWorkers=8,
+                     requestsPerSecond=5, baseUrl=YAHOO_CHART_URL):
+
+    rateLimiter = RateLimiter(requestsPerSecond)
+
+    def fetch(ticker):
+        tickerStart = startDate[ticker] if isinstance(startDate, dict) else startDate
+        return getYahooData(ticker, tickerStart, endDate, interval, baseUrl, rateLimiter)
+
+    stockFrames = {}
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = {ticker: executor.submit(fetch, ticker) for ticker in tickers}
+
+        for ticker, future in futures.items():
+            try:
+                stockFrames[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = str(e)
+
+    return stockFrames, errors
+
+"""
+    Grabs the latest quote of many tickers from yahoo's quote endpoint,
+    batchSize symbols per request. Returns {ticker: bar} where a bar is a
+    dict of the trading day's date (epoch seconds, UTC midnight like the
+    stored daily bars), open, high, low, close, volume and the exchange's
+    marketState ('PRE', 'REGULAR', 'POST', 'CLOSED', ...). Tickers yahoo
+    has no price for are left out.
+"""
+
+def getQuotes(tickers, batchSize=100, baseUrl=YAHOO_QUOTE_URL, rateLimiter=None):
+
+    quotes = {}
+    tickers = [str.upper(ticker) for ticker in tickers]
+
+    for start in range(0, len(tickers), batchSize):
+        url = baseUrl + '?symbols=' + ','.join(tickers[start:start + batchSize])
+
+        if rateLimiter is not None:
+            rateLimiter.wait(url)
+
+        res = getSession().get(url, timeout=15)
+        res.raise_for_status()
+        quotes.update(parseYahooQuotes(res.json()))
+
+    return quotes
+
+def parseYahooQuotes(quoteData):
+
+    response = quoteData['quoteResponse']
+
+    if response.get('error'):
+        raise ValueError(response['error'].get('description', 'No quotes returned'))
+
+    quotes = {}
+    for result in response.get('result', []):
+        close = result.get('regularMarketPrice')
+        marketTime = result.get('regularMarketTime')
+        if close is None or marketTime is None:
+            continue
+
+        # the trading day in the exchange's time zone, as a UTC midnight
+        localTime = marketTime + result.get('gmtOffSetMilliseconds', 0) // 1000
+        quotes[result['symbol']] = {
+            'date': localTime - localTime % (24 * 60 * 60),
+            'open': round(result.get('regularMarketOpen', close), 2),
+            'high': round(result.get('regularMarketDayHigh', close), 2),
+            'low': round(result.get('regularMarketDayLow', close), 2),
+            'close': round(close, 2),
+            'volume': int(result.get('regularMarketVolume', 0)),
+            'marketState': result.get('marketState', 'CLOSED')}
+
+    return quotes
 
 """
     Grabs US Stock Indicies Current Value from finance.google.com
 """
 
+""" seconds a fetched set of index quotes is reused for """
+INDEX_CACHE_SECONDS = 10
+
+indexCache = {'time': 0.0, 'data': None}
+indexCacheLock = threading.Lock()
+
+""" returns the index quotes from getIndicesGoogle, fetching them at most
+    once every maxAge seconds however many threads ask for them. If a fetch
+    fails the last quotes are returned while they are less than staleAge
+    seconds old, otherwise the error is raised """
+def getIndices(maxAge=INDEX_CACHE_SECONDS, staleAge=300):
+    with indexCacheLock:
+        age = time.monotonic() - indexCache['time']
+        if indexCache['data'] is not None and age < maxAge:
+            return indexCache['data']
+
+        try:
+            indexCache['data'] = getIndicesGoogle()
+            indexCache['time'] = time.monotonic()
+        except Exception:
+            if indexCache['data'] is None or age >= staleAge:
+                raise
+
+        return indexCache['data']
+
 def getIndicesGoogle():
 
     url = 'https://finance.google.com'
 
-    res = requests.get(url, headers={"User-Agent":"Mozilla/5.0"}, timeout=15)
+    res = getSession().get(url, timeout=15)
 
+    import bs4
     soup = bs4.BeautifulSoup(res.text, 'html.parser')
 
     indexNameList = soup.find_all("div", class_="pKBk1e")
@@ -0,0 +1,153 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import database_module as db
+from NetworkPresets import NETWORK_PRESETS, DEFAULT_PRESET, DEFAULT_LOOKBACK
+from Features import FEATURES, DEFAULT_FEATURES
+from Predictors import BACKENDS
+
+"""
+    Runs a predictor (the LSTM by default) over every ticker in the database without
+    opening the GUI. Tickers are spread across a pool of worker processes
+    and the results are written to the predictions table, or to a CSV or
+    Parquet file when --output is given.
+
+    usage: python batch_predict.py [--workers N] [--backend NAME] [--preset NAME] [--lookback DAYS]
+                                   [--features NAME ...] [--models DIR] [--db FILE] [--output FILE] [TICKER ...]
+"""
+
+""" sets up each worker process. TensorFlow is limited to a few threads
+    per process so the workers do not fight over the same cores """
+def initWorker(threadsPerWorker, backend):
+    if backend != 'lstm':
+        return
+
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threadsPerWorker)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+""" fits one of the lightweight backends from Predictors on a ticker's
+    history and predicts the next close """
+def predictTickerWithBackend(dbFile, ticker, backend):
+    from Predictors import createPredictor
+
+    predictor = createPredictor(backend)
+
+    conn = db.get_connection(dbFile)
+    data = db.select_columns(conn, ticker, ['date'] + predictor.requiredColumns())
+
+    if len(data['close']) < 30:
+        raise ValueError("Not enough data to train on")
+
+    predictor.fit(data)
+
+    lastClose = float(data['close'][-1])
+    return (ticker, db.epoch_to_date(data['date'][-1]), lastClose, predictor.predictNext(), backend)
+
+""" trains a predictor on one ticker's history and predicts the next close.
+    Runs in a worker process, so it opens its own database connection """
+def predictTicker(dbFile, ticker, preset, lookback, features, modelDirectory):
+    from LSTM import LSTMPredictor
+    from ModelRegistry import ModelRegistry
+
+    lstm = LSTMPredictor(preset, lookback=lookback, features=features)
+
+    conn = db.get_connection(dbFile)
+    data = db.select_columns(conn, ticker, ['date'] + lstm.requiredColumns())
+
+    if len(data['close']) < lstm.lookback + lstm.horizon:
+        raise ValueError("Not enough data to train on")
+
+    lstm.setStockData(data)
+
+    # warm start from a saved model when a model folder is given
+    registry = ModelRegistry(modelDirectory) if modelDirectory else None
+    newBars = registry.load(ticker, lstm) if registry else None
+
+    if newBars is None:
+        lstm.setTrainData()
+        lstm.buildNetwork()
+        lstm.trainNetwork()
+    elif newBars > 0:
+        lstm.trainNewBars(newBars)
+
+    if registry and newBars != 0:
+        registry.save(ticker, lstm)
+
+    lastClose = float(data['close'][-1])
+    predictedClose = float(lstm.predictNext())
+
+    return (ticker, db.epoch_to_date(data['date'][-1]), lastClose, predictedClose, 'lstm-' + preset)
+
+""" writes the results to a csv or parquet file depending on the extension """
+def writeOutput(path, predictions):
+    import pandas as pd
+
+    resultDF = pd.DataFrame(predictions, columns=['Ticker', 'AsOf', 'LastClose', 'PredictedClose', 'Model'])
+    if path.endswith('.parquet'):
+        resultDF.to_parquet(path, index=False)
+    else:
+        resultDF.to_csv(path, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict the next close for every ticker in the database")
+    parser.add_argument('tickers', nargs='*', help="tickers to predict, defaults to every ticker in the database")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--db', default=db.DB_FILE, help="database file to read from")
+    parser.add_argument('--backend', default='lstm', choices=list(BACKENDS), help="predictor backend")
+    parser.add_argument('--preset', default=DEFAULT_PRESET, choices=list(NETWORK_PRESETS), help="LSTM network preset")
+    parser.add_argument('--lookback', type=int, default=DEFAULT_LOOKBACK, help="days the LSTM sees per prediction")
+    parser.add_argument('--features', nargs='+', default=list(DEFAULT_FEATURES), choices=list(FEATURES),
+                        metavar='NAME', help="LSTM input features")
+    parser.add_argument('--models', default=None, help="folder of saved models to warm start from and save to")
+    parser.add_argument('--output', default=None, help="write results to this .csv or .parquet file instead of the database")
+    args = parser.parse_args()
+
+    conn = db.get_connection(args.db)
+    db.migrate_legacy_tables(conn)
+    tickers = [str.upper(ticker) for ticker in args.tickers] or db.select_tickers(conn)
+
+    threadsPerWorker = max(1, (os.cpu_count() or 1) // args.workers)
+
+    predictions = []
+    startTime = time.perf_counter()
+
+    # spawn so every worker starts with a clean TensorFlow state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             initializer=initWorker, initargs=(threadsPerWorker, args.backend)) as executor:
+        if args.backend == 'lstm':
+            futures = {executor.submit(predictTicker, args.db, ticker, args.preset, args.lookback,
+                                       args.features, args.models): ticker
+                       for ticker in tickers}
+        else:
+            futures = {executor.submit(predictTickerWithBackend, args.db, ticker, args.backend): ticker
+                       for ticker in tickers}
+
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                predictions.append(future.result())
+                print(ticker + ": " + str(round(predictions[-1][3], 2)))
+            except Exception as e:
+                print(ticker + ": failed, " + str(e))
+
+    elapsed = time.perf_counter() - startTime
+
+    if args.output:
+        writeOutput(args.output, predictions)
+    else:
+        db.insert_predictions(conn, predictions)
+
+    print("Predicted " + str(len(predictions)) + " of " + str(len(tickers)) +
+          " tickers in " + str(round(elapsed, 2)) + "s")
+
+    db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+import database_module as db
+from NetworkPresets import NETWORK_PRESETS, DEFAULT_LOOKBACK
+from Features import FEATURES, DEFAULT_FEATURES, requiredColumns
+
+# resource only exists on Unix. Elsewhere the peak memory comes from psutil
+# when it is installed and is reported as nan when it is not
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+    Compares the LSTM network presets on stored price data. For every
+    preset it reports the parameter count, training time, peak memory and
+    the error on a held out validation split, so a preset can be picked
+    that is accurate enough and fast enough.
+
+    usage: python benchmark_lstm.py [--db FILE] [--validation 0.2] [--lookback DAYS] [--features NAME ...] [TICKER ...]
+"""
+
+""" returns the peak resident memory of this process in megabytes """
+def peakRssMb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # linux reports kilobytes, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    try:
+        import psutil
+    except ImportError:
+        return float('nan')
+
+    # windows keeps the peak working set, anything else only the current size
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+
+""" trains one preset on each ticker and measures it. Runs in its own
+    process so the peak memory belongs to this preset alone """
+def benchmarkPreset(preset, lookback, features, dataByTicker, validationSplit):
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+    from LSTM import LSTMPredictor, makeWindows
+
+    trainSeconds = 0.0
+    errors = []
+    parameterCount = 0
+    skipped = []
+
+    for ticker, data in dataByTicker.items():
+        closes = data['close']
+        splitIndex = int(len(closes) * (1 - validationSplit))
+
+        lstm = LSTMPredictor(preset, lookback=lookback, features=features)
+
+        # too short to make a single training window and validate on it
+        if splitIndex < lstm.lookback + lstm.horizon or splitIndex == len(closes):
+            skipped.append(ticker)
+            continue
+
+        lstm.setStockData({column: values[:splitIndex] for column, values in data.items()})
+        lstm.setTrainData()
+        lstm.buildNetwork()
+        parameterCount = lstm.network.count_params()
+
+        startTime = time.perf_counter()
+        lstm.trainNetwork()
+        trainSeconds += time.perf_counter() - startTime
+
+        # predictions over the validation split, each one made from the
+        # actual days before it. the window starting at row i predicts the
+        # close at row i + lookback + horizon - 1
+        offset = lstm.lookback + lstm.horizon - 1
+        windows = makeWindows(lstm.buildFeatures(data), lstm.lookback)[splitIndex - offset:len(closes) - offset]
+        predicted = lstm.predictWindows(windows)
+        errors.append((predicted - closes[splitIndex:]) / closes[splitIndex:])
+
+    errors = np.concatenate(errors) if errors else np.full(1, np.nan)
+    return {'preset': preset,
+            'params': parameterCount,
+            'trainSeconds': trainSeconds,
+            'peakRssMb': peakRssMb(),
+            'mape': float(np.mean(np.abs(errors)) * 100),
+            'skipped': skipped}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LSTM network presets")
+    parser.add_argument('tickers', nargs='*', default=['ADI', 'CSCO', 'QCOM'], help="tickers to train on")
+    parser.add_argument('--db', default=db.DB_FILE, help="database file to read from")
+    parser.add_argument('--validation', type=float, default=.2, help="fraction of each history held out for validation")
+    parser.add_argument('--presets', nargs='*', default=list(NETWORK_PRESETS), help="presets to compare")
+    parser.add_argument('--lookback', type=int, default=DEFAULT_LOOKBACK, help="days the network sees per prediction")
+    parser.add_argument('--features', nargs='+', default=list(DEFAULT_FEATURES), choices=list(FEATURES),
+                        metavar='NAME', help="input features")
+    args = parser.parse_args()
+
+    conn = db.get_connection(args.db)
+    db.migrate_legacy_tables(conn)
+    dataByTicker = {ticker: db.select_columns(conn, ticker, requiredColumns(args.features))
+                    for ticker in args.tickers}
+
+    print("{:<10}{:>12}{:>14}{:>14}{:>10}".format('preset', 'params', 'train (s)', 'peak RSS MB', 'MAPE %'))
+
+    context = multiprocessing.get_context('spawn')
+    for preset in args.presets:
+        with context.Pool(1) as pool:
+            result = pool.apply(benchmarkPreset, (preset, args.lookback, args.features, dataByTicker, args.validation))
+
+        print("{:<10}{:>12,}{:>14.2f}{:>14.1f}{:>10.2f}".format(result['preset'], result['params'],
+                                                              result['trainSeconds'], result['peakRssMb'],
+                                                              result['mape']))
+        if result['skipped']:
+            print("    skipped, not enough data: " + ", ".join(result['skipped']))
+
+    db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import numpy as np
+import database_module as db
+from Predictors import BACKENDS, createPredictor, walkForward
+
+"""
+    Compares the forecasting backends on stored price data with a
+    walk-forward evaluation. For every backend it reports the error of its
+    next close predictions next to how long fitting and predicting took,
+    so each ticker can get the cheapest model that is accurate enough.
+
+    usage: python compare_predictors.py [--backends ar ets ...] [--test 0.2] [--refit 20] [TICKER ...]
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward comparison of the predictor backends")
+    parser.add_argument('tickers', nargs='*', default=['ADI', 'AMD', 'CSCO'], help="tickers to evaluate on")
+    parser.add_argument('--db', default=db.DB_FILE, help="database file to read from")
+    parser.add_argument('--backends', nargs='*', default=['naive', 'ar', 'ets', 'gbm'],
+                        choices=list(BACKENDS), help="backends to compare")
+    parser.add_argument('--test', type=float, default=.2, help="fraction of each history that is predicted")
+    parser.add_argument('--refit', type=int, default=20, help="refit every this many days")
+    args = parser.parse_args()
+
+    conn = db.get_connection(args.db)
+    db.migrate_legacy_tables(conn)
+
+    print("{:<8}{:>10}{:>14}{:>14}{:>16}".format('backend', 'MAPE %', 'direction %', 'fit ms/fit', 'predict us/call'))
+
+    for name in args.backends:
+        errors = []
+        directionHits = []
+        fitSeconds = 0.0
+        predictSeconds = 0.0
+        fitCount = 0
+        predictCount = 0
+
+        for ticker in args.tickers:
+            predictor = createPredictor(name)
+            data = db.select_columns(conn, ticker, predictor.requiredColumns())
+            closes = data['close']
+            start = int(len(closes) * (1 - args.test))
+
+            predictions, fitTime, predictTime = walkForward(predictor, data, start, args.refit)
+
+            actual = closes[start:]
+            previous = closes[start - 1:-1]
+            errors.append(np.abs(predictions - actual) / actual)
+            directionHits.append(np.sign(predictions - previous) == np.sign(actual - previous))
+
+            fitSeconds += fitTime
+            predictSeconds += predictTime
+            fitCount += len(range(0, len(actual), args.refit))
+            predictCount += len(actual)
+
+        print("{:<8}{:>10.2f}{:>14.1f}{:>14.2f}{:>16.1f}".format(
+            name,
+            np.mean(np.concatenate(errors)) * 100,
+            np.mean(np.concatenate(directionHits)) * 100,
+            fitSeconds / fitCount * 1000,
+            predictSeconds / predictCount * 1e6))
+
+    db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
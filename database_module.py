@@ -1,11 +1,30 @@
 import sqlite3
 from sqlite3 import Error
-import pandas as pd
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timedelta
+import calendar
+import time
 import sys
-from YahooStockGrab import getYahooData
+import threading
+from YahooStockGrab import getYahooData, getManyYahooData, getYahooBars, INTRADAY_INTERVALS
 
 # The purpose of this module is to communicate and exchange data with SQLite3 databse
+# pandas is imported by the functions that build or read dataframes, so
+# opening the database at startup does not have to wait for it
+
+# default database file used by the application
+DB_FILE = 'stocksDB.db'
+
+# every ticker lives in one prices table keyed on (ticker, date)
+# dates are stored as integer unix timestamps (UTC midnight for daily bars)
+# WITHOUT ROWID stores the rows in primary key order, so a ticker's rows
+# sit next to each other and range / last row lookups are index seeks
+PRICE_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# daily news sentiment that select_columns can join onto the price rows,
+# as the SQL for each column. Days without news are 0
+SENTIMENT_COLUMNS = {'sentiment': "COALESCE(s.compound_sum / s.headlines, 0)",
+                     'headlines': "COALESCE(s.headlines, 0)"}
 
 # creates connection to SQLite3 database specified by file
 # parameter is database file name & local directory
@@ -19,104 +38,750 @@ def create_connection(db_file):
 
     return conn
 
-# selects all data from a table and returns it as a pandas dataframe
-# parameters are database connection object and ticker aka table name
+# pragmas applied to every connection handed out by a ConnectionManager
+# WAL lets readers keep reading while the update thread writes, and
+# synchronous=NORMAL only syncs at checkpoints, which is safe under WAL
+CONNECTION_PRAGMAS = ["PRAGMA journal_mode=WAL",
+                      "PRAGMA synchronous=NORMAL",
+                      "PRAGMA cache_size=-16000",  # 16 MB page cache
+                      "PRAGMA mmap_size=268435456",  # 256 MB memory map
+                      "PRAGMA temp_store=MEMORY",
+                      "PRAGMA busy_timeout=5000"]
+
+# hands out one reusable connection per thread for a database file
+# and keeps track of all of them so they can be closed on exit
+class ConnectionManager():
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+
+    """ returns the calling thread's connection, opening it on first use """
+    def get(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # the connection is only ever used by the thread that opened it,
+            # the flag just lets close_all close it from the main thread
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    """ closes the calling thread's connection if it has one """
+    def release(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            self.local.conn = None
+            with self.lock:
+                self.connections.remove(conn)
+            conn.close()
+
+    """ closes every connection handed out by this manager """
+    def close_all(self):
+        with self.lock:
+            connections = self.connections
+            self.connections = []
+        for conn in connections:
+            try:
+                conn.close()
+            except Error as e:
+                print(e)
+        self.local = threading.local()
+
+# one manager per database file
+connectionManagers = {}
+connectionManagersLock = threading.Lock()
+
+# returns the calling thread's connection to a database file
+# repeated calls from the same thread get the same connection back
+def get_connection(db_file=DB_FILE):
+    with connectionManagersLock:
+        manager = connectionManagers.get(db_file)
+        if manager is None:
+            manager = ConnectionManager(db_file)
+            connectionManagers[db_file] = manager
+    return manager.get()
+
+# closes the calling thread's connection to a database file
+# threads that finish should call this so their handle is not left open
+def release_connection(db_file=DB_FILE):
+    manager = connectionManagers.get(db_file)
+    if manager is not None:
+        manager.release()
+
+# closes every pooled connection, called when the application exits
+def close_all_connections():
+    with connectionManagersLock:
+        managers = list(connectionManagers.values())
+    for manager in managers:
+        manager.close_all()
+
+# converts a 'YYYY-MM-DD' string (or an epoch int) to the integer
+# unix timestamp stored in the date column
+def date_to_epoch(date):
+    if isinstance(date, str):
+        return calendar.timegm(datetime.strptime(date[:10], '%Y-%m-%d').timetuple())
+    return int(date)
+
+# converts a stored unix timestamp back to a 'YYYY-MM-DD' string
+def epoch_to_date(epoch):
+    return datetime.utcfromtimestamp(epoch).strftime('%Y-%m-%d')
+
+# turns an optional 'YYYY-MM-DD' start and end date into the epoch bounds of
+# a BETWEEN, a missing date leaves that side of the range open
+def _epoch_bounds(startDate, endDate):
+    startEpoch = date_to_epoch(startDate) if startDate is not None else -sys.maxsize
+    endEpoch = date_to_epoch(endDate) if endDate is not None else sys.maxsize
+    return startEpoch, endEpoch
+
+# turns rows from the prices table into the dataframe layout
+# the rest of the program uses, with Date as a 'YYYY-MM-DD' string
+def rows_to_df(rows):
+    import pandas as pd
+    tableDF = pd.DataFrame(rows, columns=PRICE_COLUMNS)
+    tableDF['Date'] = pd.to_datetime(tableDF['Date'], unit='s').dt.strftime('%Y-%m-%d')
+    return tableDF
+
+# selects all data for a ticker and returns it as a pandas dataframe
+# parameters are database connection object and ticker
 def select_all(conn, ticker):
     cur = conn.cursor()
-    cur.execute("Select * FROM " + ticker)
+    cur.execute("SELECT date, open, high, low, close, volume FROM prices WHERE ticker=? ORDER BY date",
+                (str.upper(ticker),))
+    rows = cur.fetchall()
+    return rows_to_df(rows)
+
+# selects the rows for a ticker between two dates (inclusive)
+# either date can be None to leave that side of the range open
+# params are connection object, ticker, startDate, endDate
+def select_range(conn, ticker, startDate=None, endDate=None):
+    startEpoch, endEpoch = _epoch_bounds(startDate, endDate)
+
+    cur = conn.cursor()
+    cur.execute("SELECT date, open, high, low, close, volume FROM prices "
+                "WHERE ticker=? AND date BETWEEN ? AND ? ORDER BY date",
+                (str.upper(ticker), startEpoch, endEpoch))
+    rows = cur.fetchall()
+    return rows_to_df(rows)
+
+# selects only the requested columns for a ticker between two dates (inclusive)
+# the column list, date range and ordering are all done in SQL and the
+# result comes back as a dict of {column: contiguous numpy array}
+# dates are int64 unix timestamps, volume is int64, prices are float64
+# the SENTIMENT_COLUMNS can be asked for too, they are joined on from the
+# daily_sentiment table in the same query, both sides by primary key
+# params are connection object, ticker, list of columns, startDate, endDate
+def select_columns(conn, ticker, columns, startDate=None, endDate=None):
+    columns = [str.lower(column) for column in columns]
+    for column in columns:
+        if column.capitalize() not in PRICE_COLUMNS and column not in SENTIMENT_COLUMNS:
+            raise ValueError("Unknown price column: " + column)
+
+    startEpoch, endEpoch = _epoch_bounds(startDate, endDate)
+
+    cur = conn.cursor()
+    if any(column in SENTIMENT_COLUMNS for column in columns):
+        create_news_tables(conn)
+        selected = [SENTIMENT_COLUMNS.get(column, "p." + column) for column in columns]
+        cur.execute("SELECT " + ", ".join(selected) + " FROM prices p "
+                    "LEFT JOIN daily_sentiment s ON s.ticker = p.ticker AND s.date = p.date "
+                    "WHERE p.ticker=? AND p.date BETWEEN ? AND ? ORDER BY p.date",
+                    (str.upper(ticker), startEpoch, endEpoch))
+    else:
+        cur.execute("SELECT " + ", ".join(columns) + " FROM prices "
+                    "WHERE ticker=? AND date BETWEEN ? AND ? ORDER BY date",
+                    (str.upper(ticker), startEpoch, endEpoch))
+    table = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, len(columns))
+
+    arrays = {}
+    for index, column in enumerate(columns):
+        dtype = np.int64 if column in ('date', 'volume', 'headlines') else np.float64
+        arrays[column] = np.ascontiguousarray(table[:, index], dtype=dtype)
+    return arrays
+
+# selects the rows for many tickers in one query
+# returns a dataframe with a Ticker column in front of the price columns
+# params are connection object, list of tickers, startDate, endDate
+def select_many(conn, tickers, startDate=None, endDate=None):
+    startEpoch, endEpoch = _epoch_bounds(startDate, endDate)
+    tickers = [str.upper(ticker) for ticker in tickers]
+
+    cur = conn.cursor()
+    cur.execute("SELECT ticker, date, open, high, low, close, volume FROM prices "
+                "WHERE ticker IN (" + ",".join("?" * len(tickers)) + ") AND date BETWEEN ? AND ? "
+                "ORDER BY ticker, date",
+                tickers + [startEpoch, endEpoch])
     rows = cur.fetchall()
-    tableDF = pd.DataFrame(rows, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+    import pandas as pd
+    tableDF = pd.DataFrame(rows, columns=['Ticker'] + PRICE_COLUMNS)
+    tableDF['Date'] = pd.to_datetime(tableDF['Date'], unit='s').dt.strftime('%Y-%m-%d')
     return tableDF
 
+# returns a list of every ticker that has data stored
+def select_tickers(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT ticker FROM prices ORDER BY ticker")
+    return [row[0] for row in cur.fetchall()]
+
 # selects and returns the last row for a ticker
 def select_last_row(conn, ticker):
     cur = conn.cursor()
-    cur.execute('Select * FROM ' + ticker + ' ORDER BY ROWID DESC LIMIT 1;')
-    data = cur.fetchall()
-    return data[0]
+    cur.execute("SELECT date, open, high, low, close, volume FROM prices WHERE ticker=? "
+                "ORDER BY date DESC LIMIT 1", (str.upper(ticker),))
+    data = cur.fetchone()
+    return (epoch_to_date(data[0]),) + tuple(data[1:])
 
 # selects a specific cell from a row identified by its date
 # parameters are connection object, ticker, cell, date
 # returns python data type
-def select_specific_data(conn, ticker, cell, date):
+def select_cell(conn, ticker, cell, date):
+    if cell.capitalize() not in PRICE_COLUMNS:
+        raise ValueError("Unknown price column: " + cell)
+
     cur = conn.cursor()
-    cur.execute("SELECT" + cell + " FROM " + ticker + " WHERE Date=?",(date,))
-    data = cur.fetchall()
-    return data
+    cur.execute("SELECT " + cell + " FROM prices WHERE ticker=? AND date=?",
+                (str.upper(ticker), date_to_epoch(date)))
+    data = cur.fetchone()
+    return data[0] if data is not None else None
 
 # selects a whole row from a table by date and returns as pandas dataframe
 # params are connection object, ticker, date
 def select_specific_data(conn, ticker, date):
     cur = conn.cursor()
-    cur.execute("SELECT * FROM " + ticker + " WHERE date=?",(date,))
+    cur.execute("SELECT date, open, high, low, close, volume FROM prices WHERE ticker=? AND date=?",
+                (str.upper(ticker), date_to_epoch(date)))
     rows = cur.fetchall()
-    rowDF = pd.DataFrame(rows, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
-    return rowDF
+    return rows_to_df(rows)
 
-# creates a table if it doesnt exist by ticker name
-# params are connection object and ticker
-def create_table(conn, ticker):
-    create_table_sql = """CREATE TABLE IF NOT EXISTS """ + ticker + """ (
-                                Date   STRING,
-                                Open   DOUBLE,
-                                High   DOUBLE,
-                                Low    DOUBLE,
-                                Close  DOUBLE,
-                                Volume INTEGER
-                            ); """
+# creates the prices table if it doesnt exist
+# params are connection object
+def create_table(conn):
+    create_table_sql = """CREATE TABLE IF NOT EXISTS prices (
+                                ticker TEXT    NOT NULL,
+                                date   INTEGER NOT NULL,
+                                open   REAL,
+                                high   REAL,
+                                low    REAL,
+                                close  REAL,
+                                volume INTEGER,
+                                PRIMARY KEY (ticker, date)
+                            ) WITHOUT ROWID; """
     try:
         c = conn.cursor()
         c.execute(create_table_sql)
     except Error as e:
         print(e)
 
-# deletes all rows from a table without deleting the table
-# params are connection object and ticker
-def delete_rows(conn, ticker):
+# creates the predictions table if it doesnt exist
+# one row per ticker and as-of date, as_of is the date of the last close
+# the prediction was made from
+def create_predictions_table(conn):
+    create_table_sql = """CREATE TABLE IF NOT EXISTS predictions (
+                                ticker          TEXT    NOT NULL,
+                                as_of           INTEGER NOT NULL,
+                                last_close      REAL,
+                                predicted_close REAL,
+                                model           TEXT,
+                                created         INTEGER,
+                                PRIMARY KEY (ticker, as_of)
+                            ) WITHOUT ROWID; """
+    try:
+        c = conn.cursor()
+        c.execute(create_table_sql)
+    except Error as e:
+        print(e)
+
+# writes many predictions in one transaction, replacing any earlier
+# prediction for the same ticker and as-of date
+# params are connection object and a list of
+# (ticker, as_of date, last close, predicted close, model name) tuples
+def insert_predictions(conn, predictions):
+    created = int(time.time())
+    rows = [(str.upper(ticker), date_to_epoch(asOf), lastClose, predictedClose, model, created)
+            for ticker, asOf, lastClose, predictedClose, model in predictions]
+
+    with conn:
+        create_predictions_table(conn)
+        conn.executemany("INSERT OR REPLACE INTO predictions (ticker, as_of, last_close, predicted_close, model, created) "
+                         "VALUES(?,?,?,?,?,?)", rows)
+
+# creates the news table and the daily sentiment table kept up to date from it
+# news has one row per headline, ts is the headline's finviz (New York)
+# wall clock time as epoch seconds, so ts - ts % 86400 is the same day
+# value as the prices table's dates. The primary key drops headlines that
+# are stored already. Each headline that is actually inserted adds itself
+# to its day's row of daily_sentiment through the trigger, so the daily
+# aggregate never has to be recomputed from the news
+def create_news_tables(conn):
+    create_news_sql = """CREATE TABLE IF NOT EXISTS news (
+                                ticker      TEXT    NOT NULL,
+                                ts          INTEGER NOT NULL,
+                                title       TEXT    NOT NULL,
+                                compound    REAL,
+                                PRIMARY KEY (ticker, ts, title)
+                            ) WITHOUT ROWID; """
+    create_sentiment_sql = """CREATE TABLE IF NOT EXISTS daily_sentiment (
+                                ticker          TEXT    NOT NULL,
+                                date            INTEGER NOT NULL,
+                                headlines       INTEGER NOT NULL,
+                                compound_sum    REAL    NOT NULL,
+                                positive        INTEGER NOT NULL,
+                                negative        INTEGER NOT NULL,
+                                PRIMARY KEY (ticker, date)
+                            ) WITHOUT ROWID; """
+    create_trigger_sql = """CREATE TRIGGER IF NOT EXISTS news_daily_sentiment
+                              AFTER INSERT ON news
+                              BEGIN
+                                  INSERT INTO daily_sentiment (ticker, date, headlines, compound_sum, positive, negative)
+                                  VALUES (NEW.ticker, NEW.ts - NEW.ts % 86400, 1, COALESCE(NEW.compound, 0),
+                                          NEW.compound > 0, NEW.compound < 0)
+                                  ON CONFLICT(ticker, date) DO UPDATE SET
+                                      headlines = headlines + 1,
+                                      compound_sum = compound_sum + excluded.compound_sum,
+                                      positive = positive + excluded.positive,
+                                      negative = negative + excluded.negative;
+                              END; """
+    try:
+        c = conn.cursor()
+        c.execute(create_news_sql)
+        c.execute(create_sentiment_sql)
+        c.execute(create_trigger_sql)
+    except Error as e:
+        print(e)
+
+# turns a getNews dataframe (date like 'Oct-18-26' or 'Today', time like
+# '08:00AM', title, compound) into (ticker, ts, title, compound) rows
+# headlines whose date or time cannot be read are left out
+def news_to_rows(ticker, newsFrame):
+    import pandas as pd
+    dates = newsFrame['date'].replace('Today', datetime.now().strftime('%b-%d-%y'))
+    stamps = pd.to_datetime(dates + ' ' + newsFrame['time'].str.strip(), format='%b-%d-%y %I:%M%p', errors='coerce')
+    valid = stamps.notna().values
+
+    epochs = (stamps[valid].values.astype('datetime64[s]').astype(np.int64)).tolist()
+    return list(zip([str.upper(ticker)] * len(epochs), epochs,
+                    newsFrame['title'][valid].tolist(), newsFrame['compound'][valid].astype(float).tolist()))
+
+# stores the headlines of a getNews dataframe in one transaction
+# headlines that are stored already are skipped
+# returns how many headlines were new
+def insert_news(conn, ticker, newsFrame):
+    rows = news_to_rows(ticker, newsFrame)
+
+    with conn:
+        create_news_tables(conn)
+        cur = conn.executemany("INSERT OR IGNORE INTO news (ticker, ts, title, compound) VALUES(?,?,?,?)", rows)
+        return cur.rowcount
+
+# returns the daily sentiment of a ticker between two dates (inclusive)
+# as a dict of {column: numpy array}, only days with news have a row
+def select_daily_sentiment(conn, ticker, startDate=None, endDate=None):
+    startEpoch, endEpoch = _epoch_bounds(startDate, endDate)
+
+    create_news_tables(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT date, headlines, compound_sum / headlines, positive, negative FROM daily_sentiment "
+                "WHERE ticker=? AND date BETWEEN ? AND ? ORDER BY date",
+                (str.upper(ticker), startEpoch, endEpoch))
+    table = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 5)
+
+    return {'date': table[:, 0].astype(np.int64),
+            'headlines': table[:, 1].astype(np.int64),
+            'sentiment': np.ascontiguousarray(table[:, 2]),
+            'positive': table[:, 3].astype(np.int64),
+            'negative': table[:, 4].astype(np.int64)}
+
+# returns the names of the old one-table-per-ticker tables still in the database
+def select_legacy_tables(conn):
     cur = conn.cursor()
-    cur.execute("DELETE FROM " + ticker)
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'prices'")
+    legacyTables = []
+    for (name,) in cur.fetchall():
+        cur.execute("PRAGMA table_info(" + name + ")")
+        columns = [column[1].capitalize() for column in cur.fetchall()]
+        if columns == PRICE_COLUMNS:
+            legacyTables.append(name)
+    return legacyTables
+
+# moves every old per-ticker table into the prices table and drops it
+# string dates are converted to unix timestamps on the way in and
+# duplicate dates keep the last copy. all of it happens in one transaction
+# returns a dict of {ticker: rows migrated}
+def migrate_legacy_tables(conn):
+    create_table(conn)
+    migrated = {}
+
+    with conn:
+        cur = conn.cursor()
+        for ticker in select_legacy_tables(conn):
+            cur.execute("INSERT OR REPLACE INTO prices (ticker, date, open, high, low, close, volume) "
+                        "SELECT ?, CAST(strftime('%s', Date) AS INTEGER), Open, High, Low, Close, Volume "
+                        "FROM " + ticker + " WHERE Date IS NOT NULL ORDER BY ROWID",
+                        (str.upper(ticker),))
+            migrated[str.upper(ticker)] = cur.rowcount
+            cur.execute("DROP TABLE " + ticker)
+
+    return migrated
 
-# deletes a whole table
+# deletes all rows for a ticker
 # params are connection object and ticker
-def delete_table(conn, ticker):
+def delete_rows(conn, ticker):
     cur = conn.cursor()
-    cur.execute("DROP TABLE " + ticker)
+    cur.execute("DELETE FROM prices WHERE ticker=?", (str.upper(ticker),))
 
 # takes a dataframe from YahooStockGrab.py
 # and inserts it into the database
+# the delete and reinsert happen inside one transaction so a failed
+# insert leaves the old rows in place
+# returns a tuple of (rows inserted, rows per second)
 def insert_df(conn, ticker, stockData):
+    return insert_many(conn, {ticker: stockData})
+
+# converts a dataframe from YahooStockGrab.py into a list of row tuples
+# that can be handed straight to executemany
+def df_to_rows(ticker, stockData):
+    import pandas as pd
+    # a row without a close would be stored as a NULL price
+    stockData = stockData[stockData['Close'].notna()]
+    epochs = (pd.to_datetime(stockData['Date']) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return list(zip([str.upper(ticker)] * len(stockData),
+                    epochs.astype(int),
+                    stockData['Open'].astype(float),
+                    stockData['High'].astype(float),
+                    stockData['Low'].astype(float),
+                    stockData['Close'].astype(float),
+                    stockData['Volume'].astype('int64').astype(int)))
+
+# bulk inserts the data for many tickers at once
+# params are connection object and a dict of {ticker: dataframe}
+# every ticker is replaced inside a single transaction with one executemany
+# per ticker, so the whole batch costs one commit instead of one per row
+# returns a tuple of (rows inserted, rows per second)
+def insert_many(conn, stockFrames):
+    startTime = time.perf_counter()
+    rowCount = 0
+
+    with conn:
+        create_table(conn)
+        cur = conn.cursor()
+        for ticker, stockData in stockFrames.items():
+            rows = df_to_rows(ticker, stockData)
+
+            delete_rows(conn, ticker)
+            cur.executemany(" INSERT INTO prices (ticker, date, open, high, low, close, volume) VALUES(?,?,?,?,?,?,?) ", rows)
+            rowCount += len(rows)
+
+    elapsed = time.perf_counter() - startTime
+    rowsPerSec = rowCount / elapsed if elapsed > 0 else float('inf')
+    return rowCount, rowsPerSec
+
+# inserts or updates rows by date without touching the rest of the ticker
+# params are connection object, ticker and a dataframe from YahooStockGrab.py
+# returns the number of rows written
+def upsert_df(conn, ticker, stockData):
+    return upsert_many(conn, {ticker: stockData})
+
+# upserts the data for many tickers in a single transaction
+# params are connection object and a dict of {ticker: dataframe}
+# returns the number of rows written
+def upsert_many(conn, stockFrames):
+    with conn:
+        create_table(conn)
+        return _upsert_frames(conn.cursor(), stockFrames)
+
+# upserts a dict of {ticker: dataframe} with a cursor, inside the caller's
+# transaction. returns the number of rows written
+def _upsert_frames(cur, stockFrames):
+    rowCount = 0
+
+    for ticker, stockData in stockFrames.items():
+        rows = df_to_rows(ticker, stockData)
+        cur.executemany(" INSERT INTO prices (ticker, date, open, high, low, close, volume) VALUES(?,?,?,?,?,?,?) "
+                        " ON CONFLICT(ticker, date) DO UPDATE SET open=excluded.open, high=excluded.high, "
+                        " low=excluded.low, close=excluded.close, volume=excluded.volume ", rows)
+        rowCount += len(rows)
+
+    return rowCount
+
+# returns the last stored date for a ticker as a 'YYYY-MM-DD' string
+# or None if the ticker has no rows yet
+def select_last_date(conn, ticker):
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(date) FROM prices WHERE ticker=?", (str.upper(ticker),))
+    lastEpoch = cur.fetchone()[0]
+    return epoch_to_date(lastEpoch) if lastEpoch is not None else None
+
+# returns the first stored date for a ticker as a 'YYYY-MM-DD' string
+# or None if the ticker has no rows yet
+def select_first_date(conn, ticker):
+    cur = conn.cursor()
+    cur.execute("SELECT MIN(date) FROM prices WHERE ticker=?", (str.upper(ticker),))
+    firstEpoch = cur.fetchone()[0]
+    return epoch_to_date(firstEpoch) if firstEpoch is not None else None
+
+# returns the stored bar before the last one as (epoch date, close), or None
+# if the ticker has fewer than two rows. Unlike the last bar, which may be a
+# live quote, it was stored after its close
+def select_overlap_bar(conn, ticker):
+    cur = conn.cursor()
+    cur.execute("SELECT date, close FROM prices WHERE ticker=? ORDER BY date DESC LIMIT 1 OFFSET 1",
+                (str.upper(ticker),))
+    return cur.fetchone()
+
+# returns {ticker: last stored date as epoch seconds} for every ticker with
+# rows, or only for the tickers given, in one query
+def select_last_dates(conn, tickers=None):
+    cur = conn.cursor()
+    if tickers is None:
+        cur.execute("SELECT ticker, MAX(date) FROM prices GROUP BY ticker")
+    else:
+        tickers = [str.upper(ticker) for ticker in tickers]
+        cur.execute("SELECT ticker, MAX(date) FROM prices WHERE ticker IN (" +
+                    ",".join("?" * len(tickers)) + ") GROUP BY ticker", tickers)
+    return dict(cur.fetchall())
+
+# writes live quotes as daily bars in a single transaction. A quote for a
+# stored day overwrites it, a quote for a new day adds it. Rows that already
+# hold the same prices are left alone. History fetched to fill the days
+# before the quotes is written first in the same transaction, so a reader
+# never sees a quote without the days leading up to it
+# params are connection object, {ticker: bar} from YahooStockGrab.getQuotes
+# and {ticker: dataframe} from fetch_many
+# returns the list of tickers whose rows changed
+def upsert_quotes(conn, quotes, stockFrames=None):
+    stockFrames = stockFrames or {}
+    changed = [str.upper(ticker) for ticker, stockData in stockFrames.items() if len(stockData)]
+
+    with conn:
+        create_table(conn)
+        cur = conn.cursor()
+        _upsert_frames(cur, stockFrames)
+        for ticker, bar in quotes.items():
+            cur.execute(" INSERT INTO prices (ticker, date, open, high, low, close, volume) VALUES(?,?,?,?,?,?,?) "
+                        " ON CONFLICT(ticker, date) DO UPDATE SET open=excluded.open, high=excluded.high, "
+                        " low=excluded.low, close=excluded.close, volume=excluded.volume "
+                        " WHERE (open, high, low, close, volume) IS NOT "
+                        " (excluded.open, excluded.high, excluded.low, excluded.close, excluded.volume) ",
+                        (str.upper(ticker), int(bar['date']), bar['open'], bar['high'],
+                         bar['low'], bar['close'], int(bar['volume'])))
+            if cur.rowcount > 0 and str.upper(ticker) not in changed:
+                changed.append(str.upper(ticker))
+
+    return changed
+
+# the closes yahoo sends are adjusted for splits and dividends, so one of
+# those changes every close before it. A stored close further than this
+# fraction (or a cent) from the one yahoo sends now for the same day was
+# stored under an older adjustment
+ADJUSTMENT_TOLERANCE = 1e-3
+
+# brings a ticker up to date with yahoo
+# only the range from the bar before the last stored one is downloaded.
+# the last stored bar is fetched again since it may have been written
+# before the close. If the close of the bar before it changed, the whole
+# stored range is downloaded again so every row has the same adjustment.
+# a ticker with no data gets a full year
+# params are connection object and ticker
+# returns the number of rows written
+def sync_ticker(conn, ticker, interval="1d"):
+    ticker = str.upper(ticker)
+    startDate, endDate = sync_range(conn, ticker)
+
+    stockData = getYahooData(ticker, startDate, endDate, interval)
+
+    if adjustment_changed(conn, ticker, stockData):
+        stockData = getYahooData(ticker, resync_start(conn, ticker), endDate, interval)
+
+    return upsert_df(conn, ticker, stockData)
+
+# returns the ('DD-MM-YYYY', 'DD-MM-YYYY') range yahoo needs to be asked
+# for to bring a ticker up to date. It starts at the overlap bar, so
+# adjustment_changed can compare it
+def sync_range(conn, ticker):
+    endDate = datetime.today() + timedelta(days=1)
+
+    lastDate = select_last_date(conn, ticker)
+    overlapBar = select_overlap_bar(conn, ticker)
+    if lastDate is None:
+        startDate = endDate - timedelta(days=366)
+    elif overlapBar is None:
+        startDate = datetime.strptime(lastDate, '%Y-%m-%d')
+    else:
+        startDate = datetime.strptime(epoch_to_date(overlapBar[0]), '%Y-%m-%d')
+
+    return startDate.strftime('%d-%m-%Y'), endDate.strftime('%d-%m-%Y')
+
+# returns the 'DD-MM-YYYY' start of a download that replaces every stored
+# row of a ticker
+def resync_start(conn, ticker):
+    return datetime.strptime(select_first_date(conn, ticker), '%Y-%m-%d').strftime('%d-%m-%Y')
 
-    # create the table if it doesn't exist
-    create_table(conn, str.upper(ticker))
-
-    # delete all current data if the table does exist
-    delete_rows(conn, ticker)
-        
-    for x in range(0, len(stockData)):
-        dbRowEntry = []
-        dbRowEntry.append(stockData['Date'][x])
-        dbRowEntry.append(float(stockData['Open'][x]))
-        dbRowEntry.append(float(stockData['High'][x]))
-        dbRowEntry.append(float(stockData['Low'][x]))
-        dbRowEntry.append(float(stockData['Close'][x]))
-        dbRowEntry.append(int(stockData['Volume'][x]))
-
-        create_row(conn, ticker, dbRowEntry)
-
-# inserts a new row of data into the specified table
-# params are connection object, ticker, entry (a python list)
+# returns True when a dataframe from yahoo gives the stored overlap bar of a
+# ticker a different close, meaning a split or dividend changed the
+# adjustment since the stored closes were written
+def adjustment_changed(conn, ticker, stockData):
+    overlapBar = select_overlap_bar(conn, ticker)
+    if overlapBar is None:
+        return False
+
+    fetched = stockData['Close'][stockData['Date'] == epoch_to_date(overlapBar[0])]
+    if len(fetched) == 0:
+        return False
+
+    storedClose = overlapBar[1]
+    return abs(float(fetched.iloc[0]) - storedClose) > max(.01, abs(storedClose) * ADJUSTMENT_TOLERANCE)
+
+# brings many tickers up to date at once
+# the downloads run concurrently over a shared session and everything that
+# comes back is written in one transaction
+# params are connection object, list of tickers and the number of download threads
+# returns a tuple of (rows written, {ticker: error message})
+def sync_many(conn, tickers, interval="1d", maxWorkers=8):
+    stockFrames, errors = fetch_many(conn, tickers, interval, maxWorkers)
+
+    return upsert_many(conn, stockFrames), errors
+
+# downloads what sync_many would write without writing it. Like
+# sync_ticker, a ticker whose adjustment changed is downloaded again in full
+# returns a tuple of ({ticker: dataframe}, {ticker: error message})
+def fetch_many(conn, tickers, interval="1d", maxWorkers=8):
+    tickers = [str.upper(ticker) for ticker in tickers]
+
+    startDates = {}
+    for ticker in tickers:
+        startDates[ticker], endDate = sync_range(conn, ticker)
+
+    stockFrames, errors = getManyYahooData(tickers, startDates, endDate, interval, maxWorkers)
+
+    readjusted = [ticker for ticker, stockData in stockFrames.items()
+                  if adjustment_changed(conn, ticker, stockData)]
+    if readjusted:
+        startDates = {ticker: resync_start(conn, ticker) for ticker in readjusted}
+        fullFrames, fullErrors = getManyYahooData(readjusted, startDates, endDate, interval, maxWorkers)
+
+        # the partial download of a ticker that failed again would mix
+        # adjustments, so it is not written either
+        for ticker in fullErrors:
+            stockFrames.pop(ticker)
+        stockFrames.update(fullFrames)
+        errors.update(fullErrors)
+
+    return stockFrames, errors
+
+# intraday bars (the INTRADAY_INTERVALS of YahooStockGrab) live in their own
+# table keyed on (ticker, interval, date), date being the epoch second
+# start of each bar. Like prices it is WITHOUT ROWID, so a ticker's bars
+# of one interval sit next to each other in time order
+def create_intraday_table(conn):
+    create_table_sql = """CREATE TABLE IF NOT EXISTS intraday_prices (
+                                ticker   TEXT    NOT NULL,
+                                interval TEXT    NOT NULL,
+                                date     INTEGER NOT NULL,
+                                open     REAL,
+                                high     REAL,
+                                low      REAL,
+                                close    REAL,
+                                volume   INTEGER,
+                                PRIMARY KEY (ticker, interval, date)
+                            ) WITHOUT ROWID; """
+    try:
+        c = conn.cursor()
+        c.execute(create_table_sql)
+    except Error as e:
+        print(e)
+
+# writes intraday bars in one transaction, replacing bars with the same start
+# params are connection object, ticker, interval and a dict of arrays from
+# YahooStockGrab.getYahooBars
+# returns the number of rows written
+def upsert_intraday(conn, ticker, interval, bars):
+    rows = list(zip([str.upper(ticker)] * len(bars['date']), [interval] * len(bars['date']),
+                    bars['date'].tolist(), bars['open'].tolist(), bars['high'].tolist(),
+                    bars['low'].tolist(), bars['close'].tolist(), bars['volume'].tolist()))
+
+    with conn:
+        create_intraday_table(conn)
+        conn.executemany(" INSERT OR REPLACE INTO intraday_prices (ticker, interval, date, open, high, low, close, volume) "
+                         " VALUES(?,?,?,?,?,?,?,?) ", rows)
+
+    return len(rows)
+
+# selects a ticker's intraday bars from startTime to endTime (epoch seconds)
+# returns a dict of numpy arrays like select_columns
+def select_intraday(conn, ticker, interval, startTime=None, endTime=None):
+    create_intraday_table(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT date, open, high, low, close, volume FROM intraday_prices "
+                "WHERE ticker=? AND interval=? AND date BETWEEN ? AND ? ORDER BY date",
+                (str.upper(ticker), interval,
+                 -sys.maxsize if startTime is None else int(startTime),
+                 sys.maxsize if endTime is None else int(endTime)))
+    table = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 6)
+
+    arrays = {}
+    for index, column in enumerate(['date', 'open', 'high', 'low', 'close', 'volume']):
+        dtype = np.int64 if column in ('date', 'volume') else np.float64
+        arrays[column] = np.ascontiguousarray(table[:, index], dtype=dtype)
+    return arrays
+
+# returns the start of a ticker's last stored intraday bar, or None
+def select_last_intraday(conn, ticker, interval):
+    create_intraday_table(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(date) FROM intraday_prices WHERE ticker=? AND interval=?",
+                (str.upper(ticker), interval))
+    return cur.fetchone()[0]
+
+# brings a ticker's intraday bars up to date with yahoo
+# downloads from the last stored bar, or as far back as yahoo keeps bars of
+# the interval, in as many requests as yahoo's span limit needs. The bars go
+# into the intraday_prices table, or into barStore (a BarStore) when given
+# returns the number of bars written
+def sync_intraday(conn, ticker, interval, barStore=None):
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError("Unknown intraday interval: " + interval)
+
+    ticker = str.upper(ticker)
+    requestDays, historyDays = INTRADAY_INTERVALS[interval]
+    daySeconds = 24 * 60 * 60
+
+    if barStore is not None:
+        lastTime = barStore.lastTime(ticker, interval)
+    else:
+        lastTime = select_last_intraday(conn, ticker, interval)
+
+    endTime = int(time.time())
+    startTime = max(lastTime or 0, endTime - historyDays * daySeconds)
+
+    chunks = [getYahooBars(ticker, chunkStart, min(chunkStart + requestDays * daySeconds, endTime), interval)
+              for chunkStart in range(startTime, endTime, requestDays * daySeconds)]
+    if not chunks:
+        return 0
+    bars = {column: np.concatenate([chunk[column] for chunk in chunks]) for column in chunks[0]}
+
+    if barStore is not None:
+        return barStore.write(ticker, interval, bars)
+    return upsert_intraday(conn, ticker, interval, bars)
+
+# inserts a new row of data for the specified ticker
+# params are connection object, ticker, entry (a python list of date, open, high, low, close, volume)
 def create_row(conn, ticker, entry):
-    command = ''' INSERT INTO ''' + ticker + ''' (date, open, high, low, close, volume) VALUES(?,?,?,?,?,?) '''
+    command = ''' INSERT INTO prices (ticker, date, open, high, low, close, volume) VALUES(?,?,?,?,?,?,?) '''
     cur = conn.cursor()
-    cur.execute(command, entry)
+    cur.execute(command, [str.upper(ticker), date_to_epoch(entry[0])] + list(entry[1:]))
     conn.commit()
-    return cur.lastrowid
 
-# updates close cell of speficied date in specified table
+# updates close cell of speficied date for the specified ticker
 # params are connection object, ticker, date, close
 def update_cell(conn, ticker, date, close):
     cur = conn.cursor()
-    cur.execute("UPDATE " + ticker + " SET close=? WHERE date=?",(close,date,))
+    cur.execute("UPDATE prices SET close=? WHERE ticker=? AND date=?",
+                (close, str.upper(ticker), date_to_epoch(date)))
     conn.commit()
-
-    
@@ -0,0 +1,34 @@
+import sys
+import time
+import database_module as db
+
+"""
+    Converts a database that still has one table per ticker into the
+    single prices table used by database_module.
+
+    usage: python migrate_db.py [database file]
+"""
+
+def main():
+    dbFile = sys.argv[1] if len(sys.argv) > 1 else 'stocksDB.db'
+
+    conn = db.create_connection(dbFile)
+
+    startTime = time.perf_counter()
+    migrated = db.migrate_legacy_tables(conn)
+    elapsed = time.perf_counter() - startTime
+
+    if not migrated:
+        print("Nothing to migrate in " + dbFile)
+        return
+
+    # reclaim the space left behind by the dropped tables
+    conn.execute("VACUUM")
+    conn.close()
+
+    print("Migrated " + str(len(migrated)) + " tickers, " + str(sum(migrated.values())) +
+          " rows in " + str(round(elapsed, 2)) + "s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import time
+import database_module as db
+from Backtester import backtest
+from Predictors import BACKENDS
+from NetworkPresets import DEFAULT_LOOKBACK
+from Features import FEATURES, DEFAULT_FEATURES
+
+"""
+    Runs a walk-forward backtest of a predictor backend over the stored
+    price history of every ticker (or the tickers given) and prints the
+    error and long/flat strategy results per ticker.
+
+    usage: python run_backtest.py [--backend ar] [--folds 4] [--window DAYS] [--workers N]
+                                  [--lookback DAYS] [--features NAME ...] [TICKER ...]
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest over stocksDB.db")
+    parser.add_argument('tickers', nargs='*', help="tickers to backtest, defaults to every ticker in the database")
+    parser.add_argument('--db', default=db.DB_FILE, help="database file to read from")
+    parser.add_argument('--backend', default='ar', choices=list(BACKENDS), help="predictor backend")
+    parser.add_argument('--test', type=float, default=.2, help="fraction of each history to backtest over")
+    parser.add_argument('--folds', type=int, default=4, help="folds per ticker, run in parallel")
+    parser.add_argument('--refit', type=int, default=20, help="refit every this many days")
+    parser.add_argument('--window', type=int, default=None, help="rolling train window in days, default is expanding")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--lookback', type=int, default=DEFAULT_LOOKBACK, help="days the LSTM sees per prediction")
+    parser.add_argument('--features', nargs='+', default=list(DEFAULT_FEATURES), choices=list(FEATURES),
+                        metavar='NAME', help="LSTM input features")
+    args = parser.parse_args()
+
+    conn = db.get_connection(args.db)
+    db.migrate_legacy_tables(conn)
+    tickers = [str.upper(ticker) for ticker in args.tickers] or db.select_tickers(conn)
+
+    # only the LSTM takes a lookback and features
+    options = {'lookback': args.lookback, 'features': args.features} if args.backend == 'lstm' else {}
+
+    startTime = time.perf_counter()
+    results = backtest(args.db, tickers, args.backend, options, testFraction=args.test, foldCount=args.folds,
+                       refitEvery=args.refit, trainWindow=args.window, workers=args.workers)
+    elapsed = time.perf_counter() - startTime
+
+    print("{:<8}{:>6}{:>9}{:>11}{:>12}{:>12}{:>9}{:>10}".format(
+        'ticker', 'days', 'MAPE %', 'direct. %', 'strategy %', 'buy&hold %', 'sharpe', 'max DD %'))
+
+    for ticker, scores in sorted(results.items()):
+        if 'error' in scores:
+            print("{:<8}  {}".format(ticker, scores['error']))
+            continue
+
+        print("{:<8}{:>6}{:>9.2f}{:>11.1f}{:>12.2f}{:>12.2f}{:>9.2f}{:>10.2f}".format(
+            ticker, scores['days'], scores['mape'], scores['direction'], scores['strategyReturn'],
+            scores['buyHoldReturn'], scores['sharpe'], scores['maxDrawdown']))
+
+    print("Backtested " + str(len(tickers)) + " tickers in " + str(round(elapsed, 2)) + "s")
+
+    db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+import database_module as db
+from BarStore import BarStore
+from YahooStockGrab import TICKER_LIST, INTRADAY_INTERVALS
+
+"""
+    Brings the price data for the whole ticker universe (or the tickers
+    given on the command line) up to date without opening the GUI.
+    Intraday intervals go into the intraday_prices table, or into the
+    memory mapped bar store with --store npy.
+
+    usage: python sync_prices.py [--workers N] [--db FILE] [--interval 1d|1m|5m|15m|1h]
+                                 [--store sqlite|npy] [TICKER ...]
+"""
+
+""" syncs the intraday bars of each ticker in turn
+    returns a tuple of (bars written, {ticker: error message}) """
+def syncIntraday(conn, tickers, interval, barStore=None):
+    rowCount = 0
+    errors = {}
+    for ticker in tickers:
+        try:
+            rowCount += db.sync_intraday(conn, ticker, interval, barStore)
+        except Exception as e:
+            errors[ticker] = str(e)
+    return rowCount, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Download missing price data for many tickers at once")
+    parser.add_argument('tickers', nargs='*', help="tickers to sync, defaults to the full ticker list")
+    parser.add_argument('--workers', type=int, default=8, help="number of concurrent downloads")
+    parser.add_argument('--db', default=db.DB_FILE, help="database file to write to")
+    parser.add_argument('--interval', default='1d', choices=['1d'] + list(INTRADAY_INTERVALS), help="bar interval")
+    parser.add_argument('--store', default='sqlite', choices=['sqlite', 'npy'],
+                        help="where intraday bars are kept, daily bars always go to the database")
+    parser.add_argument('--bars', default='bars', help="bar store directory for --store npy")
+    args = parser.parse_args()
+
+    tickers = args.tickers or TICKER_LIST
+
+    conn = db.get_connection(args.db)
+    db.migrate_legacy_tables(conn)
+
+    startTime = time.perf_counter()
+    if args.interval == '1d':
+        rowCount, errors = db.sync_many(conn, tickers, maxWorkers=args.workers)
+    else:
+        rowCount, errors = syncIntraday(conn, tickers, args.interval,
+                                        BarStore(args.bars) if args.store == 'npy' else None)
+    elapsed = time.perf_counter() - startTime
+
+    for ticker, error in errors.items():
+        print(ticker + ": " + error)
+
+    print("Synced " + str(len(tickers) - len(errors)) + " tickers, " + str(rowCount) +
+          " rows in " + str(round(elapsed, 2)) + "s")
+
+    db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_module as db
+from YahooStockGrab import getYahooData, getManyYahooData
+
+"""
+    Runs the yahoo chart fetcher against a local stub server through the
+    baseUrl hook, so parsing, retries and the database write are checked
+    without the network.
+"""
+
+DAY = 24 * 60 * 60
+
+# 2026-01-05 to 2026-01-07 at 14:30 UTC, the middle day has no prices
+CHART = {'chart': {'error': None, 'result': [{
+    'meta': {'gmtoffset': -18000},
+    'timestamp': [1767623400, 1767623400 + DAY, 1767623400 + 2 * DAY],
+    'indicators': {'quote': [{'open': [10.004, None, 12.0],
+                              'high': [11.0, None, 13.0],
+                              'low': [9.0, None, 11.5],
+                              'close': [10.5, None, 12.5],
+                              'volume': [1000, None, 3000]}],
+                   'adjclose': [{'adjclose': [10.25, None, 12.25]}]}}]}}
+
+# what yahoo sends for a range nothing traded in
+EMPTY_CHART = {'chart': {'error': None, 'result': [{
+    'meta': {'gmtoffset': -18000},
+    'indicators': {'quote': [{}], 'adjclose': [{}]}}]}}
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    # {ticker: responses still to fail with a 503 before the chart is sent}
+    failures = {}
+    requests = []
+    # period1 of every request
+    starts = []
+
+    def do_GET(self):
+        ticker = self.path.split('?')[0].rsplit('/', 1)[-1]
+        StubHandler.requests.append(ticker)
+        StubHandler.starts.append(int(parse_qs(urlparse(self.path).query)['period1'][0]))
+
+        if StubHandler.failures.get(ticker, 0) > 0:
+            StubHandler.failures[ticker] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        if ticker == 'MISSING':
+            body = {'chart': {'result': None, 'error': {'description': 'No data found, symbol may be delisted'}}}
+        elif ticker == 'EMPTY':
+            body = EMPTY_CHART
+        else:
+            body = CHART
+
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class YahooStubTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.baseUrl = 'http://127.0.0.1:' + str(cls.server.server_port) + '/v8/finance/chart/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubHandler.failures = {}
+        StubHandler.requests = []
+        StubHandler.starts = []
+
+    def fetch(self, ticker):
+        return getYahooData(ticker, '05-01-2026', '08-01-2026', '1d', baseUrl=self.baseUrl)
+
+    def test_parses_the_chart(self):
+        stockData = self.fetch('ADI')
+
+        self.assertEqual(list(stockData.columns), ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual(list(stockData['Date']), ['2026-01-05', '2026-01-07'])
+        self.assertEqual(list(stockData['Open']), [10.0, 12.0])
+        # the adjusted close is the one kept
+        self.assertEqual(list(stockData['Close']), [10.25, 12.25])
+        self.assertEqual(list(stockData['Volume']), [1000, 3000])
+
+    def test_empty_range(self):
+        stockData = self.fetch('EMPTY')
+
+        self.assertEqual(list(stockData.columns), ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual(len(stockData), 0)
+
+    def test_retries_server_errors(self):
+        StubHandler.failures = {'ADI': 2}
+
+        stockData = self.fetch('ADI')
+
+        self.assertEqual(StubHandler.requests, ['ADI'] * 3)
+        self.assertEqual(len(stockData), 2)
+
+    def test_yahoo_errors_are_reported_per_ticker(self):
+        stockFrames, errors = getManyYahooData(['ADI', 'MISSING'], '05-01-2026', '08-01-2026', '1d',
+                                               maxWorkers=2, requestsPerSecond=None, baseUrl=self.baseUrl)
+
+        self.assertEqual(list(stockFrames), ['ADI'])
+        self.assertIn('delisted', errors['MISSING'])
+
+    def test_null_bars_are_not_stored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dbFile = os.path.join(directory, 'stub.db')
+            try:
+                conn = db.get_connection(dbFile)
+                db.upsert_df(conn, 'ADI', self.fetch('ADI'))
+                prices = db.select_columns(conn, 'ADI', ['date', 'close'])
+            finally:
+                db.close_all_connections()
+
+        self.assertEqual([db.epoch_to_date(date) for date in prices['date']], ['2026-01-05', '2026-01-07'])
+        self.assertFalse(any(close != close for close in prices['close']))
+
+
+    """ stores {date: close} for ADI, syncs it from the stub and returns the
+        stored closes by date """
+    def syncStored(self, storedCloses):
+        import pandas as pd
+
+        def fetch(ticker, startDate, endDate, interval):
+            return getYahooData(ticker, startDate, endDate, interval, baseUrl=self.baseUrl)
+
+        closes = list(storedCloses.values())
+        stored = pd.DataFrame({'Date': list(storedCloses), 'Open': closes, 'High': closes, 'Low': closes,
+                               'Close': closes, 'Volume': [100] * len(closes)})
+
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                conn = db.get_connection(os.path.join(directory, 'stub.db'))
+                db.upsert_df(conn, 'ADI', stored)
+                with mock.patch.object(db, 'getYahooData', fetch):
+                    db.sync_ticker(conn, 'ADI')
+                prices = db.select_columns(conn, 'ADI', ['date', 'close'])
+            finally:
+                db.close_all_connections()
+
+        return {db.epoch_to_date(date): close for date, close in zip(prices['date'], prices['close'])}
+
+    def test_sync_keeps_an_unchanged_adjustment(self):
+        closes = self.syncStored({'2026-01-02': 10.0, '2026-01-05': 10.25, '2026-01-07': 12.0})
+
+        # one download from the overlap bar on, the last bar is replaced
+        self.assertEqual(StubHandler.requests, ['ADI'])
+        self.assertEqual(closes, {'2026-01-02': 10.0, '2026-01-05': 10.25, '2026-01-07': 12.25})
+
+    def test_sync_downloads_again_when_the_adjustment_changed(self):
+        # stored before a 2 for 1 split, yahoo now sends 10.25 for the 5th
+        self.syncStored({'2026-01-02': 19.0, '2026-01-05': 20.5, '2026-01-07': 24.5})
+
+        # the second download starts at the first stored day
+        self.assertEqual(StubHandler.requests, ['ADI', 'ADI'])
+        self.assertLess(StubHandler.starts[1], StubHandler.starts[0])
+
+
+if __name__ == '__main__':
+    unittest.main()